@@ -0,0 +1,104 @@
+import cv2
+import numpy as np
+
+from DocumentProcessor import DocumentProcessor
+
+class AutoCapture:
+    """
+    Decides when to capture a page without the operator pressing Capture.
+
+    A capture fires once the detected quad has moved less than max_motion
+    pixels per frame for stable_frames consecutive frames and the page
+    region is sharp enough (variance of the Laplacian). After a capture the
+    trigger is disarmed until the page is gone for rearm_missing_frames
+    consecutive frames or moves by more than rearm_motion pixels, so one
+    placement never produces two captures, even when detection drops out
+    for a frame or two.
+    """
+
+    def __init__(self, stable_frames=8, max_motion=3.0, sharpness_threshold=80.0, rearm_motion=40.0,
+                 sharpness_size=320, rearm_missing_frames=5):
+        self.stable_frames = stable_frames
+        self.max_motion = max_motion
+        self.sharpness_threshold = sharpness_threshold
+        self.rearm_motion = rearm_motion
+        self.rearm_missing_frames = rearm_missing_frames
+        # Longest side of the page crop used for the sharpness score
+        self.sharpness_size = sharpness_size
+
+        self.previous = None
+        self.stable_count = 0
+        self.missing_count = 0
+        self.armed = True
+        self.captured_corners = None
+        self.last_sharpness = 0.0
+        self.captures = 0
+
+    def reset(self):
+        self.previous = None
+        self.stable_count = 0
+        self.missing_count = 0
+        self.armed = True
+        self.captured_corners = None
+
+    def update(self, frame, corners):
+        """Feed one frame and its detected corners; True means capture now"""
+        if corners is None:
+            self.previous = None
+            self.stable_count = 0
+            self.missing_count += 1
+            # Page removed, not just a detection dropout: the next page may be captured
+            if self.missing_count >= self.rearm_missing_frames:
+                self.armed = True
+            return False
+        self.missing_count = 0
+
+        # Detection may list the corners in a different order each frame
+        points = DocumentProcessor.order_corners(corners)
+
+        if not self.armed:
+            moved = np.linalg.norm(points - self.captured_corners, axis=1).max()
+            if moved <= self.rearm_motion:
+                return False
+            self.armed = True
+            self.stable_count = 0
+
+        if self.previous is not None and np.linalg.norm(points - self.previous, axis=1).max() <= self.max_motion:
+            self.stable_count += 1
+        else:
+            self.stable_count = 0
+        self.previous = points
+
+        if self.stable_count < self.stable_frames:
+            return False
+
+        self.last_sharpness = self.measure_sharpness(frame, points)
+        if self.last_sharpness < self.sharpness_threshold:
+            return False
+
+        self.armed = False
+        self.captured_corners = points
+        self.stable_count = 0
+        self.captures += 1
+        return True
+
+    def measure_sharpness(self, frame, points):
+        """Variance of the Laplacian over the page's bounding box"""
+        height, width = frame.shape[:2]
+        x0, y0 = np.floor(points.min(axis=0)).astype(int)
+        x1, y1 = np.ceil(points.max(axis=0)).astype(int)
+        x0, y0 = max(0, x0), max(0, y0)
+        x1, y1 = min(width, x1), min(height, y1)
+        if x1 - x0 < 8 or y1 - y0 < 8:
+            return 0.0
+
+        crop = frame[y0:y1, x0:x1]
+        # Score a bounded-size crop so the cost doesn't depend on resolution
+        scale = min(1.0, self.sharpness_size / max(crop.shape[:2]))
+        if scale < 1.0:
+            crop = cv2.resize(crop, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        if crop.ndim == 3:
+            crop = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
+
+        _, std = cv2.meanStdDev(cv2.Laplacian(crop, cv2.CV_16S))
+        return float(std[0, 0] ** 2)
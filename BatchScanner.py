@@ -0,0 +1,221 @@
+"""
+Headless batch scanning.
+
+Runs document detection, perspective warp and enhancement over a directory
+or glob of images on all cores and writes the pages to PDF. Does not import
+Tk and never opens a camera, so it can run on servers and in cron jobs.
+
+    python BatchScanner.py scans/ -o scans.pdf
+    python BatchScanner.py "inbox/*.jpg" --split -o out/
+"""
+import argparse
+import glob
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+
+from CameraManager import CameraManager
+from DocumentProcessor import DocumentProcessor
+from EnhancementEngine import PRESETS
+from PageCache import PageCache
+from PDFManager import PDFManager
+from PDFWriter import encode_image
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff", ".webp")
+
+# Per-process detection and processing objects, created by init_worker
+_camera_manager = None
+_document_processor = None
+
+
+def collect_images(inputs):
+    """Expand directories and glob patterns into a sorted list of image paths"""
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            matches = [os.path.join(item, name) for name in os.listdir(item)]
+        else:
+            matches = glob.glob(item)
+        paths.extend(
+            sorted(path for path in matches if os.path.isfile(path) and path.lower().endswith(IMAGE_EXTENSIONS))
+        )
+    return paths
+
+
+def get_tile_threads(jobs):
+    """Cores left to each worker process for banded enhancement of large pages"""
+    return max(1, (os.cpu_count() or 1) // jobs)
+
+
+def init_worker(preset="balanced", cache_dir=None, bilevel=False, tile_threads=1):
+    global _camera_manager, _document_processor
+    # Workers share the cores between them; keep OpenCV from oversubscribing
+    # the CPU and only split large pages over the cores a worker has to itself
+    cv2.setNumThreads(1)
+    _camera_manager = CameraManager(camera_index=None)
+    _document_processor = DocumentProcessor(preset=preset, cache_dir=cache_dir, bilevel=bilevel, tile_threads=tile_threads)
+
+
+def scan_array(image):
+    """Detect, warp and enhance one decoded image. Returns (page, detected)"""
+    if _camera_manager is None:
+        init_worker()
+
+    corners = _camera_manager.find_document(image, search_all=True)
+    if corners is not None:
+        warped = _document_processor.process_document(image, corners)
+        if warped is not None:
+            return warped, True
+    # Keep the page as-is when no document could be extracted, like the GUI does
+    return image, False
+
+
+def scan_image(path):
+    """
+    Detect, warp, enhance and encode one image. Returns (path, encoded,
+    detected, cache_hit) where encoded is the (data, info) pair of
+    encode_image, so only the compressed stream goes back to the parent
+    process. cache_hit is None when the page cache was not consulted.
+    """
+    image = cv2.imread(path)
+    if image is None:
+        return path, None, False, None
+    if _document_processor is None:
+        init_worker()
+    # The cache counts live in the worker, so report this image's outcome
+    cache = _document_processor.cache
+    hits = cache.hits if cache else 0
+    misses = cache.misses if cache else 0
+    page, detected = scan_array(image)
+    cache_hit = None
+    if cache is not None and (cache.hits, cache.misses) != (hits, misses):
+        cache_hit = cache.hits > hits
+    return path, encode_image(page), detected, cache_hit
+
+
+def ordered_map(executor, fn, items, window):
+    """
+    Like executor.map, but keeps at most window tasks in flight so results
+    of a large job are not all held in memory at once. Results are yielded
+    in input order.
+    """
+    done = object()
+    items = iter(items)
+    pending = deque()
+    while True:
+        # Top the window up, then hand back the oldest result
+        while len(pending) < window:
+            item = next(items, done)
+            if item is done:
+                break
+            pending.append(executor.submit(fn, item))
+        if not pending:
+            return
+        yield pending.popleft().result()
+
+
+def split_name(path, used):
+    """PDF name for one image; a/scan.jpg and b/scan.jpg become scan.pdf and scan_2.pdf"""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    name = stem + ".pdf"
+    number = 1
+    while name.lower() in used:
+        number += 1
+        name = f"{stem}_{number}.pdf"
+    used.add(name.lower())
+    return name
+
+
+def run_batch(paths, output, split=False, jobs=None, preset="balanced", cache_dir=None, bilevel=False):
+    """Scan paths into one PDF (or one PDF per image with split). Returns stats"""
+    # Fewer images than cores leaves cores for splitting each page
+    jobs = max(1, min(jobs or os.cpu_count() or 1, len(paths)))
+    start = time.perf_counter()
+    pages = 0
+    detected = 0
+    failed = []
+    pdfs = []
+    cache_hits = 0
+    cache_misses = 0
+    # Output names already taken in this run
+    used_names = set()
+
+    if split:
+        os.makedirs(output, exist_ok=True)
+
+    pdf_manager = PDFManager()
+    with ProcessPoolExecutor(max_workers=jobs, initializer=init_worker, initargs=(preset, cache_dir, bilevel, get_tile_threads(jobs))) as executor:
+        for path, encoded, was_detected, cache_hit in ordered_map(executor, scan_image, paths, jobs * 2):
+            if encoded is None:
+                failed.append(path)
+                continue
+            pages += 1
+            detected += was_detected
+            if cache_hit is not None:
+                cache_hits += cache_hit
+                cache_misses += not cache_hit
+            pdf_manager.add_encoded_image(*encoded)
+
+            if split:
+                filename = os.path.join(output, split_name(path, used_names))
+                if pdf_manager.create_pdf(filename):
+                    pdfs.append(filename)
+                else:
+                    failed.append(path)
+                    pdf_manager.clear_all_images()
+
+    if not split and pdf_manager.get_image_count() > 0:
+        if pdf_manager.create_pdf(output):
+            pdfs.append(output)
+
+    elapsed = time.perf_counter() - start
+    return {
+        "images": len(paths),
+        "pages": pages,
+        "detected": detected,
+        "failed": failed,
+        "pdfs": pdfs,
+        "cache_hits": cache_hits,
+        "cache_misses": cache_misses,
+        "seconds": elapsed,
+        "pages_per_second": pages / elapsed if elapsed > 0 else 0.0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scan a directory or glob of images into PDF without the GUI.")
+    parser.add_argument("inputs", nargs="+", help="image files, directories or glob patterns")
+    parser.add_argument("-o", "--output", required=True, help="output PDF, or output directory with --split")
+    parser.add_argument("--split", action="store_true", help="write one PDF per input image")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="balanced", help="enhancement preset")
+    parser.add_argument("--bilevel", action="store_true", help="store black and white pages as 1-bit CCITT G4")
+    parser.add_argument("--cache", metavar="DIR", default=None, help="reuse processed pages cached in DIR")
+    args = parser.parse_args(argv)
+
+    paths = collect_images(args.inputs)
+    if not paths:
+        parser.error("no images found")
+
+    stats = run_batch(paths, args.output, split=args.split, jobs=args.jobs, preset=args.preset, cache_dir=args.cache, bilevel=args.bilevel)
+
+    print(f"Scanned {stats['pages']}/{stats['images']} images ({stats['detected']} documents detected) "
+          f"in {stats['seconds']:.2f}s - {stats['pages_per_second']:.2f} pages/s")
+    for path in stats["failed"]:
+        print(f"Failed: {path}")
+    for filename in stats["pdfs"]:
+        print(f"Wrote {filename}")
+    if args.cache:
+        cache = PageCache(args.cache).get_stats()
+        lookups = stats["cache_hits"] + stats["cache_misses"]
+        hit_rate = stats["cache_hits"] / lookups if lookups else 0.0
+        print(f"Cache: {stats['cache_hits']}/{lookups} hits ({hit_rate:.0%}), "
+              f"{cache['pages']} pages, {cache['bytes'] / 1e6:.1f} MB")
+    return 0 if not stats["failed"] else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
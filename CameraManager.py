@@ -1,146 +1,429 @@
+import math
+import threading
+import time
+from collections import deque
 import cv2
 import numpy as np
+from CornerTracker import CornerTracker
+from FrameSource import CameraSource
+from MotionGate import MotionGate
+from Profiler import profiler
 
 class CameraManager:
 
-    def __init__(self):
-        # Initialize camera
-        self.cap = cv2.VideoCapture(0)
-        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-        
+    def __init__(self, camera_index=0, source=None, detection_width=640, detection_max_pixels=640 * 480,
+                 refine_corners=True, tracking=False, redetect_interval=10, motion_gating=False,
+                 motion_threshold=3.0, resolution=(640, 480), still_resolution=None, still_mode="buffered",
+                 open_async=False):
+        # Live detection and preview run at resolution. With still_resolution
+        # set, captures use a sharper still: "buffered" streams at the still
+        # resolution and downscales every frame for the preview, "switch"
+        # streams at resolution and switches the camera up for each capture
+        self.resolution = resolution
+        self.still_resolution = still_resolution
+        self.still_mode = still_mode
+        self.current_still = None
+        # Seconds taken by each switch to the still resolution and back
+        self.still_latencies = deque(maxlen=50)
+
+        # Initialize camera, or use the given frame source (see FrameSource);
+        # camera_index=None without a source gives a detection-only manager.
+        # Opening a camera can take seconds, so with open_async it happens on
+        # a background thread; read() returns None until it is ready
+        self.cap = source
+        self.camera_state = "ready"
+        self.released = False
+        self.open_seconds = None
+        if source is None and camera_index is not None:
+            if open_async:
+                self.camera_state = "connecting"
+                threading.Thread(target=self.open_camera, args=(camera_index,), name="camify-open", daemon=True).start()
+            else:
+                self.open_camera(camera_index)
+
         # Initialize document detection variables
         self.is_document_detected = False
         self.document_corners = None
         self.current_image = None
-    
-    def get_frame(self):
-        """Capture a frame from the camera"""
-        ret, frame = self.cap.read()
+
+        # Detection runs on a downscaled copy no wider than detection_width and
+        # never larger than detection_max_pixels, so its cost stays constant
+        self.detection_width = detection_width
+        self.detection_max_pixels = detection_max_pixels
+        # Refine the rescaled corners on full-resolution crops
+        self.refine_corners = refine_corners
+        # Minimum document area, in source pixels
+        self.min_document_area = 10000
+
+        # Follow the corners between frames and only re-detect every
+        # redetect_interval frames or when the track is lost
+        self.tracking = tracking
+        self.tracker = CornerTracker(redetect_interval=redetect_interval)
+
+        # Reuse the previous detection while the scene is not changing
+        self.motion_gating = motion_gating
+        self.motion_gate = MotionGate(threshold=motion_threshold)
+
+        # Guards the detection state when detection runs off the UI thread
+        self.lock = threading.Lock()
+
+        # Detection intermediates are written into reused buffers
+        self.buffers = {}
+        # Shape of the last camera frame, for reading into pooled buffers
+        self.frame_shape = None
+
+    def open_camera(self, camera_index):
+        """Open and warm up the camera, then set camera_state to ready or failed"""
+        start = time.perf_counter()
+        width, height = self.still_resolution if self.buffers_stills() else self.resolution
+        cap = CameraSource(camera_index, width, height)
+        # The first read is often the slow one; get it out of the way here
+        if not cap.isOpened() or not cap.read()[0]:
+            cap.release()
+            self.camera_state = "failed"
+            return
+        self.open_seconds = time.perf_counter() - start
+        profiler.record("camera.open", self.open_seconds)
+        if self.released:
+            # Closed while we were still opening
+            cap.release()
+            return
+        self.cap = cap
+        self.camera_state = "ready"
+
+    def read(self, image=None):
+        """Read a raw frame from the camera without storing it, into image if given"""
+        if self.cap is None:
+            return None
+        with profiler.stage("camera.read"):
+            ret, frame = self.cap.read(image)
         if ret:
-            self.current_image = frame.copy()
+            self.frame_shape = frame.shape
             return frame
         return None
-    
-    def process_frame_local(self, frame):
+
+    def get_frame(self):
+        """Capture a frame from the camera; the frame is kept, so don't draw on it"""
+        frame, still = self.read_pair()
+        if frame is not None:
+            self.current_image = frame
+            self.current_still = still
+        return frame
+
+    def buffers_stills(self):
+        return self.still_resolution is not None and self.still_mode == "buffered"
+
+    def read_pair(self, pool=None):
+        """
+        Read a frame and return (preview, still). The still is the full
+        resolution frame in buffered mode and None otherwise. With a
+        FramePool, frames are read into its buffers; the caller then owns
+        one reference to each returned frame.
+        """
+        buf = pool.acquire(self.frame_shape) if pool is not None else None
+        frame = self.read(buf)
+        if pool is not None and frame is not buf:
+            # Not read into the pooled buffer (no frame, or a new size)
+            pool.release(buf)
+        if frame is None:
+            return None, None
+        if not self.buffers_stills():
+            return frame, None
+        return self.make_preview(frame, pool), frame
+
+    def get_preview_size(self, width, height):
+        preview_width = self.resolution[0]
+        return preview_width, max(1, int(round(height * preview_width / width)))
+
+    def make_preview(self, frame, pool=None):
+        """Downscale a still to the preview width, keeping its aspect ratio"""
+        height, width = frame.shape[:2]
+        if width <= self.resolution[0]:
+            if pool is not None:
+                # Both halves of the pair are released separately
+                pool.retain(frame)
+            return frame
+        size = self.get_preview_size(width, height)
+        dst = pool.acquire((size[1], size[0]) + frame.shape[2:]) if pool is not None else None
+        with profiler.stage("camera.preview"):
+            return cv2.resize(frame, size, dst=dst, interpolation=cv2.INTER_AREA)
+
+    def grab_still(self, flush_frames=5):
+        """
+        Switch the open camera to still_resolution, read one frame and switch
+        back. Drivers keep delivering frames of the old size for a moment, so
+        up to flush_frames reads are spent waiting for the new size. Returns
+        None when the camera does not change resolution.
+        """
+        if self.cap is None or self.still_resolution is None:
+            return None
+        width, height = self.still_resolution
+        start = time.perf_counter()
+        still = None
         try:
-            # Make a copy of the original frame
-            original = frame.copy()
-            # Convert to grayscale
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            # Apply Gaussian blur with smaller kernel for speed
-            blurred = cv2.GaussianBlur(gray, (3, 3), 0)
-
-            # Apply Otsu's thresholding
-            _, th2 = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-            
-            # Find contours - use CHAIN_APPROX_SIMPLE to reduce points
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+            for _ in range(flush_frames + 1):
+                ret, frame = self.cap.read()
+                if ret and frame.shape[1] > self.resolution[0]:
+                    still = frame
+                    break
+        finally:
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.resolution[0])
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.resolution[1])
+        latency = time.perf_counter() - start
+        self.still_latencies.append(latency)
+        profiler.record("camera.switch_still", latency)
+        return still
+
+    def get_still_stats(self):
+        latencies = list(self.still_latencies)
+        if not latencies:
+            return None
+        return {
+            "switches": len(latencies),
+            "mean_ms": sum(latencies) / len(latencies) * 1000.0,
+            "max_ms": max(latencies) * 1000.0,
+        }
+
+    def scale_corners_to_still(self, corners, preview_shape, still):
+        """
+        Map corners found on a preview frame onto its full-resolution still.
+
+        A still with a different aspect ratio than the preview (a 4:3 preview
+        of a 16:9 sensor mode) is cropped or letterboxed in a way the camera
+        doesn't tell us, so the document is detected on the still instead.
+        Returns None when it can't be found there.
+        """
+        scale_x = still.shape[1] / preview_shape[1]
+        scale_y = still.shape[0] / preview_shape[0]
+        if abs(scale_x / scale_y - 1.0) > 0.01:
+            return self.find_document(still, search_all=True)
+        points = corners.reshape(4, 2).astype(np.float32) * np.float32([scale_x, scale_y])
+        if self.refine_corners and scale_x > 1.0:
+            # Snap to the real corners, which the preview only resolves to a few pixels
+            with profiler.stage("detect.refine"):
+                points = self.refine_quad(still, points, 1.0 / scale_x)
+        return np.round(points).astype(np.int32).reshape(4, 1, 2)
+
+    def get_detection_scale(self, width, height):
+        """Scale factor that brings a frame within the detection size budget"""
+        scale = 1.0
+        if self.detection_width:
+            scale = min(scale, self.detection_width / width)
+        if self.detection_max_pixels:
+            scale = min(scale, math.sqrt(self.detection_max_pixels / (width * height)))
+        return scale
+
+    def buffer(self, name, shape):
+        """Return a reusable uint8 buffer, reallocating only when the shape changes"""
+        buf = self.buffers.get(name)
+        if buf is None or buf.shape != shape:
+            buf = np.empty(shape, dtype=np.uint8)
+            self.buffers[name] = buf
+        return buf
+
+    def prepare_gray(self, frame):
+        """Return the grayscale detection image for a frame and its scale"""
+        height, width = frame.shape[:2]
+        scale = self.get_detection_scale(width, height)
+
+        # Downscale before any per-pixel work; INTER_AREA avoids aliasing
+        if scale < 1.0:
+            small_size = (max(1, int(round(width * scale))), max(1, int(round(height * scale))))
+            small = self.buffer("small", (small_size[1], small_size[0]) + frame.shape[2:])
+            with profiler.stage("detect.resize"):
+                cv2.resize(frame, small_size, dst=small, interpolation=cv2.INTER_AREA)
+        else:
+            small = frame
+
+        # Two gray buffers in turn: the tracker keeps the previous one for optical flow
+        plane = small.shape[:2]
+        gray = self.buffer("gray_a", plane)
+        if gray is self.tracker.prev_gray:
+            gray = self.buffer("gray_b", plane)
+
+        # Convert to grayscale
+        with profiler.stage("detect.cvtColor"):
+            cv2.cvtColor(small, cv2.COLOR_BGR2GRAY, dst=gray)
+        return gray, scale
+
+    def find_document(self, frame, search_all=True, gray=None, scale=None):
+        """
+        Find the document quadrilateral in a frame.
+
+        Detection runs on a copy downscaled to the detection budget and the
+        corners are mapped back to source coordinates. Returns the corners as
+        an int32 array shaped (4, 1, 2), or None when no document is found.
+        A grayscale detection image from prepare_gray can be passed in to
+        avoid converting the frame twice.
+        """
+        if gray is None:
+            gray, scale = self.prepare_gray(frame)
+
+        # Apply Gaussian blur with smaller kernel for speed
+        with profiler.stage("detect.GaussianBlur"):
+            blurred = cv2.GaussianBlur(gray, (3, 3), 0, dst=self.buffer("blurred", gray.shape))
+
+        # Apply Otsu's thresholding
+        with profiler.stage("detect.threshold"):
+            _, th2 = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU,
+                                   dst=self.buffer("binary", gray.shape))
+
+        # Find contours - use CHAIN_APPROX_SIMPLE to reduce points
+        with profiler.stage("detect.findContours"):
             contours, _ = cv2.findContours(th2, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            
-            # Reset document detection status
-            self.is_document_detected = False
-            self.document_corners = None
-            
-            # Only process if we have contours
-            if contours:
-                # Find the largest contour first (potential optimization)
-                largest_contour = max(contours, key=cv2.contourArea)
-                largest_area = cv2.contourArea(largest_contour)
-                
-                # Only process if the largest contour is big enough
-                if largest_area >= 10000:
-                    # Approximate the largest contour
-                    perimeter = cv2.arcLength(largest_contour, True)
-                    approx = cv2.approxPolyDP(largest_contour, 0.05 * perimeter, True)
-                    
-                    # If it's a quadrilateral, it's likely our document
-                    if len(approx) == 4:
-                        # Draw the document contour in green
-                        # cv2.drawContours(frame, [approx], -1, (0, 255, 0), 2)
-                        self.is_document_detected = True
-                        self.document_corners = approx
-                    else:
-                        # If the largest contour isn't a quad, try others in descending order
-                        sorted_contours = sorted(contours, key=cv2.contourArea, reverse=True)
-                        # Skip the largest one as we already checked it
-                        for cnt in sorted_contours[1:]:
-                            if cv2.contourArea(cnt) < 10000:
-                                break  # Stop early if contours get too small
-                            
-                            perimeter = cv2.arcLength(cnt, True)
-                            approx = cv2.approxPolyDP(cnt, 0.05 * perimeter, True)
-                            
-                            if len(approx) == 4:
-                                # cv2.drawContours(frame, [approx], -1, (0, 255, 0), 2)
-                                self.is_document_detected = True
-                                self.document_corners = approx
-                                break
-            
-            return frame, original
-            
-        except Exception as e:
-            print(f"Error in processing frame: {e}")
-            return frame, frame.copy()
-        
-    def process_frame(self, frame):
+
+        # The area threshold is given in source pixels
+        with profiler.stage("detect.approxPolyDP"):
+            approx = self.find_quad(contours, self.min_document_area * scale * scale, search_all)
+        if approx is None:
+            return None
+
+        if scale >= 1.0:
+            return approx
+
+        # Map the quad back to source coordinates
+        corners = approx.reshape(4, 2).astype(np.float32) / scale
+        if self.refine_corners:
+            with profiler.stage("detect.refine"):
+                corners = self.refine_quad(frame, corners, scale)
+        return np.round(corners).astype(np.int32).reshape(4, 1, 2)
+
+    def find_quad(self, contours, min_area, search_all=True):
+        """Return the largest contour that approximates to four points"""
+        # Only process if we have contours
+        if not contours:
+            return None
+
+        # Find the largest contour first (potential optimization)
+        largest_contour = max(contours, key=cv2.contourArea)
+        largest_area = cv2.contourArea(largest_contour)
+
+        # Only process if the largest contour is big enough
+        if largest_area < min_area:
+            return None
+
+        # Approximate the largest contour
+        perimeter = cv2.arcLength(largest_contour, True)
+        approx = cv2.approxPolyDP(largest_contour, 0.05 * perimeter, True)
+
+        # If it's a quadrilateral, it's likely our document
+        if len(approx) == 4:
+            return approx
+
+        if search_all:
+            # If the largest contour isn't a quad, try others in descending order
+            sorted_contours = sorted(contours, key=cv2.contourArea, reverse=True)
+            # Skip the largest one as we already checked it
+            for cnt in sorted_contours[1:]:
+                if cv2.contourArea(cnt) < min_area:
+                    break  # Stop early if contours get too small
+
+                perimeter = cv2.arcLength(cnt, True)
+                approx = cv2.approxPolyDP(cnt, 0.05 * perimeter, True)
+
+                if len(approx) == 4:
+                    return approx
+        return None
+
+    def refine_quad(self, frame, corners, scale):
+        """Refine rescaled corners with sub-pixel search on full-resolution crops"""
+        height, width = frame.shape[:2]
+        # One detection pixel covers 1/scale source pixels; search a little wider
+        radius = int(math.ceil(1.0 / scale)) + 3
+        refined = corners.copy()
+        criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 20, 0.1)
+
+        for i, (x, y) in enumerate(corners):
+            x0 = max(0, int(x) - 2 * radius)
+            y0 = max(0, int(y) - 2 * radius)
+            x1 = min(width, int(x) + 2 * radius + 1)
+            y1 = min(height, int(y) + 2 * radius + 1)
+            # The search window must fit inside the crop
+            if x1 - x0 <= 2 * radius + 1 or y1 - y0 <= 2 * radius + 1:
+                continue
+
+            crop = frame[y0:y1, x0:x1]
+            if crop.ndim == 3:
+                crop = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
+            point = np.array([[[x - x0, y - y0]]], dtype=np.float32)
+            try:
+                point = cv2.cornerSubPix(crop, point, (radius, radius), (-1, -1), criteria)
+            except cv2.error:
+                continue
+
+            new_x = point[0, 0, 0] + x0
+            new_y = point[0, 0, 1] + y0
+            # Keep the coarse corner if the refinement wandered off
+            if abs(new_x - x) <= radius and abs(new_y - y) <= radius:
+                refined[i] = (new_x, new_y)
+        return refined
+
+    def track_document(self, frame):
+        """Follow the document corners, re-detecting only when needed"""
+        gray, scale = self.prepare_gray(frame)
+
+        if not self.tracker.needs_detection():
+            with profiler.stage("detect.track"):
+                approx = self.tracker.update(gray)
+            if approx is not None:
+                return approx
+
+        # Full detection, then (re)start the tracker from its result
+        approx = self.find_document(frame, search_all=False, gray=gray, scale=scale)
+        if approx is not None:
+            self.tracker.start(gray, approx, scale)
+            if self.tracker.stable_points is not None:
+                # Report the steadied corners when the re-detection agrees
+                approx = np.round(self.tracker.stable_points / scale).astype(np.int32)
+        else:
+            self.tracker.stop()
+        return approx
+
+    def process_frame(self, frame, annotate=True):
+        """
+        Detect the document in a live frame. With annotate, the contour is
+        drawn on the frame and an untouched copy is returned as original;
+        without it the frame is left as it is and returned for both, and
+        the caller draws the contour at display time.
+        """
         try:
-            # Make a copy of the original frame
-            original = frame.copy()
-            # Convert to grayscale
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            # Apply Gaussian blur with smaller kernel for speed
-            blurred = cv2.GaussianBlur(gray, (3, 3), 0)
-
-            # Apply Otsu's thresholding
-            _, th2 = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-            
-            # Find contours - use CHAIN_APPROX_SIMPLE to reduce points
-            contours, _ = cv2.findContours(th2, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            # Reset document detection status
-            self.is_document_detected = False
-            self.document_corners = None
-            # Only process if we have contours
-            if contours:
-                # Find the largest contour first (potential optimization)
-                largest_contour = max(contours, key=cv2.contourArea)
-                largest_area = cv2.contourArea(largest_contour)
-                
-                # Only process if the largest contour is big enough
-                if largest_area >= 10000:
-                    # Approximate the largest contour
-                    perimeter = cv2.arcLength(largest_contour, True)
-                    approx = cv2.approxPolyDP(largest_contour, 0.05 * perimeter, True)
-                    
-                    # If it's a quadrilateral, it's likely our document
-                    if len(approx) == 4:
-                        # Draw the document contour in green
-                        cv2.drawContours(frame, [approx], -1, (0, 255, 0), 2)
-                        self.is_document_detected = True
-                        self.document_corners = approx
-                    else:
-                        # If the largest contour isn't a quad, try others in descending order
-                        sorted_contours = sorted(contours, key=cv2.contourArea, reverse=True)
-                        # Skip the largest one as we already checked it
-                        for cnt in sorted_contours[1:]:
-                            if cv2.contourArea(cnt) < 1000:
-                                break  # Stop early if contours get too small
-                            
-                            perimeter = cv2.arcLength(cnt, True)
-                            approx = cv2.approxPolyDP(cnt, 0.05 * perimeter, True)
-                            
-                            # if len(approx) == 4:
-                            #     cv2.drawContours(frame, [approx], -1, (0, 255, 0), 2)
-                            #     self.is_document_detected = True
-                            #     self.document_corners = approx
-                            #     break
-            
+            # Keep a clean copy only when we are about to draw on the frame
+            original = frame.copy() if annotate else frame
+
+            with profiler.stage("detect.motion_gate"):
+                scene_changed = not self.motion_gating or self.motion_gate.should_process(frame)
+
+            if scene_changed:
+                # Reset document detection status
+                self.is_document_detected = False
+                self.document_corners = None
+
+                # Live frames only accept the largest contour as the document
+                if self.tracking:
+                    approx = self.track_document(frame)
+                else:
+                    approx = self.find_document(frame, search_all=False)
+            else:
+                # Static scene: keep the previous detection result
+                approx = self.document_corners
+
+            if approx is not None:
+                if annotate:
+                    # Draw the document contour in green
+                    cv2.drawContours(frame, [approx], -1, (0, 255, 0), 2)
+                self.is_document_detected = True
+                self.document_corners = approx
+
             return frame, original
-            
+
         except Exception as e:
             print(f"Error in processing frame: {e}")
-            return frame, frame.copy()
-    
+            return frame, frame.copy() if annotate else frame
+
     def release(self):
-        
-        if self.cap.isOpened():
-            self.cap.release()
\ No newline at end of file
+        self.released = True
+
+        if self.cap is not None and self.cap.isOpened():
+            self.cap.release()
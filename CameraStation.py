@@ -0,0 +1,107 @@
+from AutoCapture import AutoCapture
+from CameraManager import CameraManager
+from CapturePipeline import CapturePipeline
+from FrameSource import create_source
+
+def create_camera_manager(source=None, fps=None, **options):
+    """
+    Build a CameraManager for a source: None for camera 0, a spec string
+    (see create_source) or a frame source object.
+    """
+    camera_index = 0
+    if isinstance(source, str):
+        kind, _, arg = source.partition(":")
+        if kind == "camera":
+            # Let the manager open real cameras itself, so open_async applies
+            camera_index = int(arg) if arg else 0
+            source = None
+        else:
+            source = create_source(source, fps=fps)
+    return CameraManager(camera_index=camera_index, source=source, **options)
+
+class StationCamera:
+    """One camera of a station, with its own detection state and pipeline"""
+
+    def __init__(self, index, camera_manager, capture_pipeline=None):
+        self.index = index
+        self.name = f"Camera {index + 1}"
+        self.camera_manager = camera_manager
+        self.capture_pipeline = capture_pipeline
+        # Newest result picked up from the pipeline; its frames are pooled
+        self.latest_result = None
+        # Stability is judged per camera
+        self.auto_capture = AutoCapture()
+
+    def release_result(self):
+        if self.capture_pipeline is not None:
+            self.capture_pipeline.release_result(self.latest_result)
+        self.latest_result = None
+
+    def get_stats(self):
+        stats = {"name": self.name, "camera_state": self.camera_manager.camera_state}
+        if self.capture_pipeline is not None:
+            stats.update(self.capture_pipeline.get_stats())
+        return stats
+
+class CameraStation:
+    """
+    Several cameras scanning at the same time.
+
+    Every camera gets its own CameraManager, so detection and tracking
+    state never mix, and its own CapturePipeline with a capture and a
+    detection thread. OpenCV releases the GIL, so the detection threads of
+    different cameras run on different cores. The page queue hands pages
+    back in submission order, so the shared PDF follows the order of
+    capture across all cameras.
+
+    Without threading only a single camera is supported; the UI then
+    drives detection itself.
+    """
+
+    def __init__(self, sources=None, threaded=True, fps=None, **camera_options):
+        if not threaded and sources and len(sources) > 1:
+            raise ValueError("Several cameras need the threaded pipeline")
+        self.threaded = threaded
+        self.fps = fps
+        self.camera_options = camera_options
+        self.cameras = []
+        for source in sources or [None]:
+            self.add_camera(source)
+
+    def add_camera(self, source=None):
+        index = len(self.cameras)
+        camera_manager = create_camera_manager(source, fps=self.fps, **self.camera_options)
+        capture_pipeline = None
+        if self.threaded:
+            capture_pipeline = CapturePipeline(camera_manager, name=f"camify-{index + 1}")
+        camera = StationCamera(index, camera_manager, capture_pipeline)
+        self.cameras.append(camera)
+        return camera
+
+    def start(self):
+        for camera in self.cameras:
+            if camera.capture_pipeline is not None:
+                camera.capture_pipeline.start()
+
+    def stop(self):
+        for camera in self.cameras:
+            if camera.capture_pipeline is not None:
+                camera.capture_pipeline.stop()
+
+    def release(self):
+        self.stop()
+        for camera in self.cameras:
+            camera.release_result()
+            camera.camera_manager.release()
+
+    def get_stats(self):
+        """
+        Per-camera frame rates and CPU use. cpu_cores is the CPU time of the
+        camera's threads as a share of one core, cpu_share its part of the
+        time used by all cameras together.
+        """
+        stats = [camera.get_stats() for camera in self.cameras]
+        total = sum(camera_stats.get("cpu_cores", 0.0) for camera_stats in stats)
+        for camera_stats in stats:
+            camera_stats["cpu_share"] = camera_stats.get("cpu_cores", 0.0) / total if total else 0.0
+        return stats
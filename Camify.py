@@ -1,30 +1,97 @@
+import time
+# Startup timings are measured from here
+START_TIME = time.perf_counter()
 
-import customtkinter as ctk
-from CameraManager import CameraManager
-from DocumentProcessor import DocumentProcessor
-from PDFManager import PDFManager
-from DocumentScannerUI import DocumentScannerUI
+import argparse
+import os
 
 class Camify:
     
-    def __init__(self):
+    def __init__(self, threaded=True, sources=None, cache_dir=None, still_resolution=None, still_mode="buffered", fps=None):
         
+        # Show the window first; OpenCV, numpy and the camera come after
+        import customtkinter as ctk
         self.root = ctk.CTk()
+        self.root.title("Camify")
+        self.root.geometry("1200x800")
+        splash = ctk.CTkLabel(self.root, text="Starting Camify...", font=("Poppins", 20, "bold"))
+        splash.pack(expand=True)
+        self.root.update()
+        self.time_to_window = time.perf_counter() - START_TIME
+        self.time_to_first_frame = None
         
+        from CameraStation import CameraStation
+        from DocumentProcessor import DocumentProcessor
+        from PDFManager import PDFManager
+        from PageProcessingQueue import PageProcessingQueue
+        from DocumentScannerUI import DocumentScannerUI
+        from Profiler import profiler
         
-        self.camera_manager = CameraManager()
-        self.document_processor = DocumentProcessor()
+        profiler.record("startup.window", self.time_to_window)
+        splash.destroy()
+        
+        # One camera per source spec, such as camera:1 or synthetic:1280x720
+        # (see create_source); camera 0 by default. Cameras are opened and
+        # warmed up on background threads. Each runs capture and detection
+        # off the Tk thread unless asked not to
+        self.station = CameraStation(sources, threaded=threaded, fps=fps, tracking=True, motion_gating=True,
+                                     still_resolution=still_resolution, still_mode=still_mode,
+                                     open_async=True)
+        # Pages of 4 MP or more going through the page queue (single-file
+        # uploads, and captures from a large --still) are enhanced in bands
+        # on all cores. Multi-file imports size this per worker process
+        self.document_processor = DocumentProcessor(cache_dir=cache_dir, tile_threads=os.cpu_count() or 1)
+        # One document for all cameras
         self.pdf_manager = PDFManager()
+        # Captured pages are processed on worker threads
+        self.page_queue = PageProcessingQueue(self.document_processor)
+        
+        self.station.start()
         
         
-        self.ui = DocumentScannerUI(self.root, self.camera_manager, self.document_processor,self.pdf_manager)
+        self.ui = DocumentScannerUI(self.root, self.station, self.document_processor,self.pdf_manager,self.page_queue,
+                                    on_first_frame=self.report_startup)
+    
+    def report_startup(self):
+        from Profiler import profiler
+        self.time_to_first_frame = time.perf_counter() - START_TIME
+        profiler.record("startup.first_frame", self.time_to_first_frame)
+        text = f"Startup: window {self.time_to_window:.2f} s, first frame {self.time_to_first_frame:.2f} s"
+        opened = [camera.camera_manager.open_seconds for camera in self.station.cameras]
+        if any(seconds is not None for seconds in opened):
+            text += " (camera open " + ", ".join(f"{seconds:.2f} s" for seconds in opened if seconds is not None) + ")"
+        print(text)
     
     def run(self):
         self.root.mainloop()
 
 
 def main():
-    app = Camify()
+    # Imports run on a process pool; a frozen Windows build must not
+    # start the GUI again in every worker
+    import multiprocessing
+    multiprocessing.freeze_support()
+    
+    parser = argparse.ArgumentParser(description="Camify document scanner")
+    parser.add_argument("--source", action="append", default=None,
+                        help="frame source: camera:N, video:PATH, images:DIR or synthetic[:WxH] (default: camera 0); "
+                             "repeat for a multi-camera station")
+    parser.add_argument("--fps", type=float, default=None, help="frame rate for replayed sources")
+    parser.add_argument("--still", metavar="WxH", default=None,
+                        help="capture pages from a full-resolution still of this size while previewing at 640x480")
+    parser.add_argument("--still-mode", choices=("buffered", "switch"), default="buffered",
+                        help="buffered streams at the still size; switch changes resolution for each capture")
+    parser.add_argument("--cache-dir", default=None, help="where processed imported pages are cached (default: ~/.cache/camify/pages); camera captures are never cached")
+    parser.add_argument("--no-cache", action="store_true", help="always reprocess imported pages")
+    args = parser.parse_args()
+    
+    still_resolution = tuple(int(v) for v in args.still.lower().split("x")) if args.still else None
+    cache_dir = None
+    if not args.no_cache:
+        from PageCache import DEFAULT_CACHE_DIR
+        cache_dir = args.cache_dir or DEFAULT_CACHE_DIR
+    app = Camify(sources=args.source, cache_dir=cache_dir, fps=args.fps,
+                 still_resolution=still_resolution, still_mode=args.still_mode)
     app.run()
 
 
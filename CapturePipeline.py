@@ -0,0 +1,247 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+from FramePool import FramePool
+
+
+class RateMeter:
+    """Measure how many times per second an event happens"""
+
+    def __init__(self, window=1.0):
+        self.window = window
+        self.rate = 0.0
+        self._count = 0
+        self._start = time.perf_counter()
+
+    def tick(self):
+        self._count += 1
+        now = time.perf_counter()
+        elapsed = now - self._start
+        # Publish a new rate once per window so the value stays readable
+        if elapsed >= self.window:
+            self.rate = self._count / elapsed
+            self._count = 0
+            self._start = now
+
+
+class CpuMeter:
+    """Measure the CPU time of the thread that calls tick(), as a share of one core"""
+
+    def __init__(self, window=1.0):
+        self.window = window
+        self.share = 0.0
+        self.seconds = 0.0
+        self._origin = None
+        self._cpu_start = 0.0
+        self._start = 0.0
+
+    def tick(self):
+        # thread_time only counts the calling thread, so each loop measures itself
+        cpu = time.thread_time()
+        now = time.perf_counter()
+        if self._origin is None:
+            self._origin = self._cpu_start = cpu
+            self._start = now
+            return
+        self.seconds = cpu - self._origin
+        elapsed = now - self._start
+        if elapsed >= self.window:
+            self.share = (cpu - self._cpu_start) / elapsed
+            self._cpu_start = cpu
+            self._start = now
+
+
+class CapturePipeline:
+    """
+    Runs camera capture and document detection on background threads.
+
+    The capture thread owns the camera and keeps only the newest frame in a
+    single-slot buffer; frames the detector has not picked up yet are dropped.
+    The detection thread processes the newest frame and publishes the result,
+    which the UI picks up without ever blocking on the camera.
+
+    Frames are read into pooled buffers and are never copied or drawn on.
+    A result returned by get_result() stays valid until the caller passes
+    it to release_result(); anything kept longer must be copied.
+    """
+
+    def __init__(self, camera_manager, pool_size=6, name="camify"):
+        self.camera_manager = camera_manager
+        # Thread name prefix, to tell the cameras of a station apart
+        self.name = name
+        # Slot, detector, published result, consumer and the next read
+        # each hold at most one frame (or preview and still pair)
+        self.frame_pool = FramePool(pool_size * 2 if camera_manager.buffers_stills() else pool_size)
+
+        # Single-slot buffer holding the most recent camera frame
+        self._frame_lock = threading.Lock()
+        self._frame_ready = threading.Condition(self._frame_lock)
+        self._latest_frame = None
+        self._latest_still = None
+        self._frame_id = 0
+
+        # Still captures waiting for the capture thread, which owns the camera
+        self._still_requests = deque()
+
+        # Latest finished detection result
+        self._result_lock = threading.Lock()
+        self._latest_result = None
+        self._result_id = 0
+        self._delivered_id = 0
+
+        self.capture_fps = RateMeter()
+        self.detect_fps = RateMeter()
+        self.display_fps = RateMeter()
+        self.capture_cpu = CpuMeter()
+        self.detect_cpu = CpuMeter()
+        self.dropped_frames = 0
+        self.frames_captured = 0
+        self.frames_detected = 0
+
+        self._running = False
+        self._threads = []
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._threads = [
+            threading.Thread(target=self._capture_loop, name=f"{self.name}-capture", daemon=True),
+            threading.Thread(target=self._detect_loop, name=f"{self.name}-detect", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        self._running = False
+        while self._still_requests:
+            self._still_requests.popleft().set_result(None)
+        with self._frame_lock:
+            self._frame_ready.notify_all()
+        for thread in self._threads:
+            thread.join(timeout=1.0)
+        self._threads = []
+
+    def request_still(self):
+        """
+        Ask the capture thread to switch the camera to its still resolution
+        for one frame. Returns a future of the still (None if unavailable).
+        """
+        future = Future()
+        if not self._running:
+            future.set_result(None)
+        else:
+            self._still_requests.append(future)
+        return future
+
+    def _capture_loop(self):
+        while self._running:
+            self.capture_cpu.tick()
+            while self._still_requests:
+                future = self._still_requests.popleft()
+                try:
+                    future.set_result(self.camera_manager.grab_still())
+                except Exception as e:
+                    future.set_exception(e)
+
+            frame, still = self.camera_manager.read_pair(self.frame_pool)
+            if frame is None:
+                # Avoid spinning when the camera is not delivering frames
+                time.sleep(0.01)
+                continue
+
+            with self._frame_lock:
+                if self._latest_frame is not None:
+                    # The detector never saw the previous frame
+                    self.dropped_frames += 1
+                    self.frame_pool.release(self._latest_frame)
+                    self.frame_pool.release(self._latest_still)
+                self._latest_frame = frame
+                self._latest_still = still
+                self._frame_id += 1
+                self.frames_captured += 1
+                self._frame_ready.notify()
+            self.capture_fps.tick()
+
+    def _detect_loop(self):
+        while self._running:
+            with self._frame_lock:
+                while self._running and self._latest_frame is None:
+                    self._frame_ready.wait(0.1)
+                    self.detect_cpu.tick()
+                if not self._running:
+                    break
+                frame = self._latest_frame
+                still = self._latest_still
+                self._latest_frame = None
+                self._latest_still = None
+
+            # Snapshot the detection state together with the frame it belongs to;
+            # the contour is drawn at display time, so the frame stays clean
+            with self.camera_manager.lock:
+                processed_frame, original_frame = self.camera_manager.process_frame(frame, annotate=False)
+                result = {
+                    "frame": processed_frame,
+                    "original": original_frame,
+                    "is_document_detected": self.camera_manager.is_document_detected,
+                    "document_corners": self.camera_manager.document_corners,
+                    # Full-resolution frame for captures, in buffered still mode
+                    "still": still,
+                }
+
+            with self._result_lock:
+                # The pipeline's reference to the result it replaces
+                self.release_result(self._latest_result)
+                self._latest_result = result
+                self._result_id += 1
+                self.frames_detected += 1
+            self.detect_fps.tick()
+            self.detect_cpu.tick()
+
+    def get_result(self):
+        """
+        Return the newest detection result not yet seen by the caller, or
+        None. Pass it to release_result() once it is no longer needed.
+        """
+        with self._result_lock:
+            if self._result_id == self._delivered_id:
+                return None
+            self._delivered_id = self._result_id
+            result = self._latest_result
+            self.frame_pool.retain(result["original"])
+            self.frame_pool.retain(result["still"])
+        self.display_fps.tick()
+        return result
+
+    def release_result(self, result):
+        """Give a result's frames back to the pool"""
+        if result is not None:
+            self.frame_pool.release(result["original"])
+            self.frame_pool.release(result["still"])
+
+    def get_stats(self):
+        stats = self.get_fps()
+        stats.update({
+            "frames_captured": self.frames_captured,
+            "frames_detected": self.frames_detected,
+            "dropped_frames": self.dropped_frames,
+            "frame_pool": self.frame_pool.get_stats(),
+        })
+        stats.update(self.get_cpu())
+        return stats
+
+    def get_cpu(self):
+        """CPU used by the capture and detection threads, in cores and in total seconds"""
+        return {
+            "cpu_cores": self.capture_cpu.share + self.detect_cpu.share,
+            "cpu_seconds": self.capture_cpu.seconds + self.detect_cpu.seconds,
+        }
+
+    def get_fps(self):
+        return {
+            "capture": self.capture_fps.rate,
+            "detect": self.detect_fps.rate,
+            "display": self.display_fps.rate,
+        }
@@ -0,0 +1,133 @@
+import cv2
+import numpy as np
+
+class CornerTracker:
+    """
+    Follows the four corners of a detected document across frames.
+
+    Corners are tracked with pyramidal Lucas-Kanade optical flow on the
+    grayscale detection image. A forward-backward consistency check and a
+    sanity check on the tracked quad decide whether the track can be trusted;
+    when it cannot, or every redetect_interval frames, the caller falls back
+    to full contour detection and restarts the tracker with the new corners.
+    """
+
+    def __init__(self, redetect_interval=10, max_fb_error=1.5, max_area_change=0.25, jitter=0.75):
+        self.redetect_interval = redetect_interval
+        # Maximum forward-backward error, in detection pixels
+        self.max_fb_error = max_fb_error
+        # Maximum relative change of the quad area between two frames
+        self.max_area_change = max_area_change
+        # Corner movements smaller than this (detection pixels) are ignored
+        self.jitter = jitter
+
+        self.lk_params = dict(
+            winSize=(21, 21),
+            maxLevel=3,
+            criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 20, 0.03),
+        )
+
+        self.prev_gray = None
+        self.points = None
+        self.stable_points = None
+        self.scale = 1.0
+        self.frames_since_detection = 0
+        self.confidence = 0.0
+
+        # Counters to see how much work tracking saves
+        self.tracked_frames = 0
+        self.detections = 0
+        self.lost_tracks = 0
+
+    def is_active(self):
+        return self.points is not None
+
+    def needs_detection(self):
+        """True when the next frame should go through full detection"""
+        return self.points is None or self.frames_since_detection >= self.redetect_interval
+
+    def start(self, gray, corners, scale):
+        """Start tracking from corners given in source coordinates"""
+        points = corners.reshape(4, 1, 2).astype(np.float32) * scale
+        self.detections += 1
+
+        # Always track on from the fresh detection, so tracking error never
+        # builds up. If it agrees with the track, the reported corners follow
+        # the same jitter rule as tracked ones so they don't jump
+        if self.points is not None and scale == self.scale and gray.shape == self.prev_gray.shape:
+            offset = np.linalg.norm((points - self.points).reshape(4, 2), axis=1)
+            if offset.max() <= self.max_fb_error * 2:
+                self.prev_gray = gray
+                self.points = points
+                self.frames_since_detection = 0
+                movement = np.linalg.norm((points - self.stable_points).reshape(4, 2), axis=1)
+                moved = movement > self.jitter
+                self.stable_points[moved] = points[moved]
+                return
+
+        self.prev_gray = gray
+        self.scale = scale
+        self.points = points
+        self.stable_points = self.points.copy()
+        self.frames_since_detection = 0
+        self.confidence = 1.0
+
+    def stop(self):
+        self.prev_gray = None
+        self.points = None
+        self.stable_points = None
+        self.confidence = 0.0
+
+    def update(self, gray):
+        """
+        Track the corners into a new grayscale frame.
+
+        Returns the corners in source coordinates as an int32 (4, 1, 2) array,
+        or None when the track was lost.
+        """
+        if self.points is None or gray.shape != self.prev_gray.shape:
+            self.stop()
+            return None
+
+        # Track forward, then back again to check the result is consistent
+        new_points, status, _ = cv2.calcOpticalFlowPyrLK(self.prev_gray, gray, self.points, None, **self.lk_params)
+        back_points, back_status, _ = cv2.calcOpticalFlowPyrLK(gray, self.prev_gray, new_points, None, **self.lk_params)
+
+        fb_error = np.linalg.norm((back_points - self.points).reshape(4, 2), axis=1)
+        if not status.all() or not back_status.all() or fb_error.max() > self.max_fb_error:
+            return self.lose_track()
+
+        # The page should still look like a convex quad of similar size
+        old_area = cv2.contourArea(self.points)
+        new_area = cv2.contourArea(new_points)
+        if old_area <= 0 or not cv2.isContourConvex(new_points):
+            return self.lose_track()
+        if abs(new_area - old_area) / old_area > self.max_area_change:
+            return self.lose_track()
+
+        self.confidence = float(max(0.0, 1.0 - fb_error.max() / self.max_fb_error))
+        self.prev_gray = gray
+        self.points = new_points
+        self.frames_since_detection += 1
+        self.tracked_frames += 1
+
+        # Only move a reported corner once it has really moved, so the corners
+        # handed to the warp don't jitter with sensor noise
+        movement = np.linalg.norm((new_points - self.stable_points).reshape(4, 2), axis=1)
+        moved = movement > self.jitter
+        self.stable_points[moved] = new_points[moved]
+
+        return np.round(self.stable_points / self.scale).astype(np.int32)
+
+    def lose_track(self):
+        self.lost_tracks += 1
+        self.stop()
+        return None
+
+    def get_stats(self):
+        return {
+            "tracked_frames": self.tracked_frames,
+            "detections": self.detections,
+            "lost_tracks": self.lost_tracks,
+            "confidence": self.confidence,
+        }
@@ -1,103 +1,119 @@
 import cv2
 import numpy as np
+from EnhancementEngine import EnhancementEngine, PRESETS
+from PageCache import PageCache
+from Profiler import profiler
+
+# Paper sizes in millimetres (portrait)
+PAPER_SIZES = {
+    "A4": (210.0, 297.0),
+    "Letter": (215.9, 279.4),
+}
 
 class DocumentProcessor:
     
-    def __init__(self):
+    def __init__(self, warp_first=True, output_size="quad", paper_size="A4", dpi=150, preset="balanced", cache_dir=None, bilevel=False, tile_threads=1):
         self.processed_image = None
         
+        # Enhancement preset: "fast", "balanced" or "archival". Large pages are
+        # enhanced in bands on tile_threads threads; the result is the same
+        self.engine = EnhancementEngine(preset, tile_threads=tile_threads)
+        # Turn black and white pages into 1-bit pages (stored as CCITT G4)
+        self.bilevel = bilevel
         
-    def enhanced_scanned_look(self, image):
-        # Convert to grayscale
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        # Warp before enhancing so enhancement only touches the page itself
+        self.warp_first = warp_first
+        # "quad" sizes the page from the detected edge lengths, "paper" from
+        # paper_size at dpi; a (width, height) tuple gives a fixed size
+        self.output_size = output_size
+        self.paper_size = paper_size
+        self.dpi = dpi
         
-        # Remove noise using a lighter Gaussian blur
-        blurred = cv2.GaussianBlur(gray, (1, 1), 0)
+        # Optional on-disk cache of processed pages, shared between processes
+        self.cache_dir = cache_dir
+        self.cache = PageCache(cache_dir) if cache_dir else None
         
-        # Use just adaptive thresholding for better detail preservation
-        # Increase blockSize and reduce C for more balanced thresholding
-        adaptive = cv2.adaptiveThreshold(
-            blurred, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
-            cv2.THRESH_BINARY, 15, 5
-        )
+    def get_settings(self):
+        """Constructor arguments that reproduce this processor's output"""
+        return {
+            "warp_first": self.warp_first,
+            "output_size": self.output_size,
+            "paper_size": self.paper_size,
+            "dpi": self.dpi,
+            "preset": self.engine.preset,
+            "cache_dir": self.cache_dir,
+            "bilevel": self.bilevel,
+            "tile_threads": self.engine.tile_threads,
+        }
+    
+    def get_cache_key(self, image, corners):
+        settings = self.get_settings()
+        # Neither changes the output
+        del settings["cache_dir"]
+        del settings["tile_threads"]
+        # Include the preset's parameters so editing a preset invalidates its pages
+        settings["params"] = PRESETS[self.engine.preset]
+        return self.cache.make_key(image, corners, settings)
         
-        # Apply minimal cleaning - smaller kernel and less aggressive
-        kernel = np.ones((1, 1), np.uint8)
+    def enhanced_scanned_look(self, image):
+        # The look itself is defined by the enhancement preset
+        with profiler.stage("process.enhance"):
+            return self.engine.enhance(image, bilevel=self.bilevel)
         
+    @staticmethod
+    def order_corners(corners):
+        """Sort corners as top-left, bottom-left, bottom-right, top-right"""
+        input_pts = np.float32(corners.reshape(4, 2))
         
-        # Improve contrast with moderation
-        clahe = cv2.createCLAHE(clipLimit=1.5, tileGridSize=(8, 8))
-        enhanced = clahe.apply(blurred)  # Apply to blurred image instead of cleaned
+        rect = np.zeros((4, 2), dtype="float32")
+        # Sum of coordinates - smallest is top-left, largest is bottom-right
+        s = input_pts.sum(axis=1)
+        rect[0] = input_pts[np.argmin(s)]  # Top-left
+        rect[2] = input_pts[np.argmax(s)]  # Bottom-right
         
-        sharpened = cv2.addWeighted(enhanced, 1.1, cv2.GaussianBlur(enhanced, (0, 0), 2), -0.1, 0)
+        # Difference of coordinates - smallest is top-right, largest is bottom-left
+        diff = np.diff(input_pts, axis=1)
+        rect[1] = input_pts[np.argmax(diff)]  # Bottom-left
+        rect[3] = input_pts[np.argmin(diff)]  # Top-right
+        return rect
+    
+    def get_output_size(self, rect):
+        """Output page size in pixels for ordered corners"""
+        tl, bl, br, tr = rect
+        # Longest of each pair of opposite edges, so no side is shrunk
+        quad_width = max(np.linalg.norm(br - bl), np.linalg.norm(tr - tl))
+        quad_height = max(np.linalg.norm(bl - tl), np.linalg.norm(br - tr))
         
-        # Decide whether to return grayscale or color based on document type
-        b, g, r = cv2.split(image)
-        diff_bg = cv2.absdiff(b, g)
-        diff_br = cv2.absdiff(b, r)
-        diff_gr = cv2.absdiff(g, r)
-        avg_diff = (np.mean(diff_bg) + np.mean(diff_br) + np.mean(diff_gr)) / 3
+        if self.output_size == "quad":
+            return max(1, int(round(quad_width))), max(1, int(round(quad_height)))
         
-        if avg_diff < 10:  # Mostly B&W document
-        # Check if it's truly B&W or has subtle colors we should enhance
-            if avg_diff < 3:
-                return sharpened
-            else:
-                # It has some color - let's enhance it slightly
-                hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
-                hsv[:,:,1] = np.clip(hsv[:,:,1] * 1.2, 0, 255).astype(np.uint8)  # Boost saturation
-                hsv[:,:,2] = sharpened  # Use sharpened grayscale for value channel
-                return cv2.cvtColor(hsv, cv2.COLOR_HSV2BGR)
-        else:
-            # For color documents, enhance colors
-            hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
-            
-            # Increase saturation to make colors more vibrant (boost by 10%)
-            hsv[:,:,1] = np.clip(hsv[:,:,1] * 1.1, 0, 255).astype(np.uint8)
-            
-            # Use the sharpened grayscale to enhance details in the value channel
-            # But blend it with original value to preserve color brightness relationships
-            original_v = hsv[:,:,2]
-            blended_v = cv2.addWeighted(original_v, 0.4, sharpened, 0.6, 0)
-            hsv[:,:,2] = blended_v
-            
-            # Convert back to BGR
-            color_enhanced = cv2.cvtColor(hsv, cv2.COLOR_HSV2BGR)
-            
-            # Final color boost - slightly increase color contrast
-            lab = cv2.cvtColor(color_enhanced, cv2.COLOR_BGR2Lab)
-            l, a, b = cv2.split(lab)
-            
-            # Enhance a and b channels (color channels in Lab color space)
-            a = cv2.addWeighted(a, 1.05, a, 0, 0)
-            b = cv2.addWeighted(b, 1.05, b, 0, 0)
-            
-            # Merge channels
-            enhanced_lab = cv2.merge([l, a, b])
-            enhanced_color = cv2.cvtColor(enhanced_lab, cv2.COLOR_Lab2BGR)
-            
-            return enhanced_color
+        if self.output_size == "paper":
+            paper_w, paper_h = PAPER_SIZES[self.paper_size]
+            # Follow the orientation of the page in the frame
+            if quad_width > quad_height:
+                paper_w, paper_h = paper_h, paper_w
+            return int(round(paper_w / 25.4 * self.dpi)), int(round(paper_h / 25.4 * self.dpi))
         
-    def process_document(self, image, corners):
+        width, height = self.output_size
+        return width, height
+    
+    def process_document(self, image, corners, use_cache=True):
         
+        # use_cache=False for camera frames: sensor noise means they never repeat
         try:
-            # Get perspective transform
-            image = self.enhanced_scanned_look(image)
-            input_pts = np.float32(corners.reshape(4, 2))
+            key = None
+            if self.cache is not None and use_cache:
+                key = self.get_cache_key(image, corners)
+                with profiler.stage("process.cache_get"):
+                    cached = self.cache.get(key)
+                if cached is not None:
+                    self.processed_image = cached
+                    return cached
             
             # Sort corners: top-left, bottom-left, bottom-right, top-right
-            rect = np.zeros((4, 2), dtype="float32")
-            # Sum of coordinates - smallest is top-left, largest is bottom-right
-            s = input_pts.sum(axis=1)
-            rect[0] = input_pts[np.argmin(s)]  # Top-left
-            rect[2] = input_pts[np.argmax(s)]  # Bottom-right
-            
-            # Difference of coordinates - smallest is top-right, largest is bottom-left
-            diff = np.diff(input_pts, axis=1)
-            rect[1] = input_pts[np.argmax(diff)]  # Bottom-left
-            rect[3] = input_pts[np.argmin(diff)]  # Top-right
+            rect = self.order_corners(corners)
             
-            width, height = 800, 800
+            width, height = self.get_output_size(rect)
             output_pts = np.float32([[0, 0],
                                     [0, height],
                                     [width, height], 
@@ -105,15 +121,26 @@ class DocumentProcessor:
             
             # Get transformation matrix
             M = cv2.getPerspectiveTransform(rect, output_pts)
-            # Apply transformation
-            warped = cv2.warpPerspective(image, M, (width, height))
+            
+            if self.warp_first:
+                # Apply transformation, then enhance only the rectified page
+                with profiler.stage("process.warp"):
+                    warped = cv2.warpPerspective(image, M, (width, height))
+                warped = self.enhanced_scanned_look(warped)
+            else:
+                # Enhance the whole frame, then apply transformation
+                image = self.enhanced_scanned_look(image)
+                with profiler.stage("process.warp"):
+                    warped = cv2.warpPerspective(image, M, (width, height))
             
             # Store the processed image
             self.processed_image = warped
             
+            if key is not None:
+                with profiler.stage("process.cache_put"):
+                    self.cache.put(key, warped)
+            
             return warped
         except Exception as e:
             print(f"Error processing document: {e}")
             return None
-    
-    
\ No newline at end of file
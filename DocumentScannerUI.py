@@ -1,12 +1,19 @@
 import cv2
+import numpy as np
 import customtkinter as ctk
 from tkinter import filedialog
-import PIL.Image, PIL.ImageTk
+import math
 import os
+from Profiler import profiler
+from PreviewRenderer import PreviewRenderer
+from RectifiedPreview import RectifiedPreview
+from PageProcessingQueue import PageProcessingQueue
+from FileImporter import FileImporter
+from BatchScanner import collect_images
 
 class DocumentScannerUI:
     
-    def __init__(self,window,camera_manager,document_processor,pdf_manager):
+    def __init__(self,window,station,document_processor,pdf_manager,page_queue=None,on_first_frame=None):
         self.window = window
         self.window.title("Camify")
         self.window.geometry("1200x800")
@@ -16,10 +23,35 @@ class DocumentScannerUI:
         ctk.set_default_color_theme("blue")
         
         # Connect managers
-        self.camera_manager = camera_manager
         self.document_processor = document_processor
         self.pdf_manager = pdf_manager
         
+        # Cameras, each with its own detection state and (unless running
+        # unthreaded) its own capture/detection pipeline; see CameraStation.
+        # Capture, the indicator and the rectified view follow the active one
+        self.station = station
+        self.active = station.cameras[0]
+        
+        # Called once the first camera frame is on screen (startup timing)
+        self.on_first_frame = on_first_frame
+        self.first_frame_shown = False
+        
+        # Pages are warped and enhanced on worker threads, not in Tk callbacks
+        self.page_queue = page_queue if page_queue is not None else PageProcessingQueue(document_processor)
+        
+        # Multi-file and folder imports run in the background
+        self.importer = None
+        # Background PDF export, while one is running
+        self.pdf_export = None
+        
+        # Live flattened view of the detected page
+        self.rectified_preview = RectifiedPreview()
+        
+        # Contour drawn over the live view, and whether timings are shown with it
+        self.frame_corners = None
+        self.frame_stats = False
+        self.show_stats = profiler.enabled
+        
         # Create UI components
         self.setup_ui()
         
@@ -29,6 +61,15 @@ class DocumentScannerUI:
         
         # Set up closing behavior
         self.window.protocol("WM_DELETE_WINDOW",self.on_closing)
+        
+        # F3 toggles the timing overlay, F4 exports the timings
+        self.window.bind("<F3>", self.toggle_stats)
+        self.window.bind("<F4>", self.export_stats)
+        
+        # Number keys select a camera; so does clicking its tile
+        if len(self.station.cameras) > 1:
+            for camera in self.station.cameras[:9]:
+                self.window.bind(str(camera.index + 1), lambda event, camera=camera: self.select_camera(camera))
     
     def setup_ui(self):
         #icon
@@ -51,10 +92,22 @@ class DocumentScannerUI:
         self.camera_title = ctk.CTkLabel(self.camera_frame, text="Camera Feed", font=("Poppins", 14, "bold"))
         self.camera_title.grid(row=0, column=0, sticky="w", padx=10, pady=5)
         
-        # Camera canvas - using standard tk.Canvas as CustomTkinter doesn't have canvas
-        # Using grid instead of pack to fill all available space
-        self.canvas = ctk.CTkCanvas(self.camera_frame, highlightthickness=0,bg="#1A1A1A")
-        self.canvas.grid(row=1, column=0, sticky="nsew", padx=0, pady=0)
+        # Camera canvases, one tile per camera in a grid as square as possible
+        # Using standard tk.Canvas as CustomTkinter doesn't have canvas
+        self.tile_frame = ctk.CTkFrame(self.camera_frame, fg_color="transparent")
+        self.tile_frame.grid(row=1, column=0, sticky="nsew", padx=0, pady=0)
+        tiled = len(self.station.cameras) > 1
+        columns = math.ceil(math.sqrt(len(self.station.cameras)))
+        self.canvases = []
+        for camera in self.station.cameras:
+            row, column = divmod(camera.index, columns)
+            # The active tile is outlined
+            canvas = ctk.CTkCanvas(self.tile_frame, highlightthickness=2 if tiled else 0, highlightbackground="#1A1A1A", bg="#1A1A1A")
+            canvas.grid(row=row, column=column, sticky="nsew", padx=1 if tiled else 0, pady=1 if tiled else 0)
+            canvas.bind("<Button-1>", lambda event, camera=camera: self.select_camera(camera))
+            self.tile_frame.grid_rowconfigure(row, weight=1)
+            self.tile_frame.grid_columnconfigure(column, weight=1)
+            self.canvases.append(canvas)
         
         # Preview frame
         self.preview_frame = ctk.CTkFrame(self.main_frame)
@@ -70,9 +123,27 @@ class DocumentScannerUI:
         self.preview_canvas = ctk.CTkCanvas(self.preview_frame,highlightthickness=0,bg="white")
         self.preview_canvas.grid(row=1, column=0, sticky="nsew", padx=0, pady=0)
         
+        # Rectified frame
+        self.rectified_frame = ctk.CTkFrame(self.main_frame)
+        self.rectified_frame.grid(row=0, column=2, padx=10, pady=10, sticky="nsew")
+        self.rectified_frame.grid_rowconfigure(1, weight=1)
+        self.rectified_frame.grid_columnconfigure(0, weight=1)
+        
+        self.rectified_title = ctk.CTkLabel(self.rectified_frame, text="Rectified View", font=("Poppins", 14, "bold"))
+        self.rectified_title.grid(row=0, column=0, sticky="w", padx=10, pady=5)
+        
+        self.rectified_canvas = ctk.CTkCanvas(self.rectified_frame, highlightthickness=0, bg="#1A1A1A")
+        self.rectified_canvas.grid(row=1, column=0, sticky="nsew", padx=0, pady=0)
+        
+        # Renderers keep one canvas image each and update its pixels in place
+        self.video_renderers = [PreviewRenderer(canvas) for canvas in self.canvases]
+        # Use default sizes as fallback until the preview canvas is laid out
+        self.preview_renderer = PreviewRenderer(self.preview_canvas, fallback_size=(480, 678))
+        self.rectified_renderer = PreviewRenderer(self.rectified_canvas)
+        
         # Control frame
         self.control_frame = ctk.CTkFrame(self.main_frame)
-        self.control_frame.grid(row=1, column=0, columnspan=2, padx=10, pady=10, sticky="ew")
+        self.control_frame.grid(row=1, column=0, columnspan=3, padx=10, pady=10, sticky="ew")
         
         # Buttons
         self.btn_capture = ctk.CTkButton(self.control_frame, text="Capture", command=self.capture_image,fg_color="#2CC985",hover_color="#229660")
@@ -92,6 +163,17 @@ class DocumentScannerUI:
         
         self.btn_add_from_files = ctk.CTkButton(self.control_frame,text="Add From Files",command=self.add_from_local)
         self.btn_add_from_files.pack(side="left", padx=11, pady=11)
+        
+        self.btn_add_folder = ctk.CTkButton(self.control_frame,text="Add Folder",command=self.add_folder)
+        self.btn_add_folder.pack(side="left", padx=5, pady=5)
+        
+        self.auto_capture_var = ctk.BooleanVar(value=False)
+        self.switch_auto_capture = ctk.CTkSwitch(self.control_frame, text="Auto Capture", variable=self.auto_capture_var, command=self.toggle_auto_capture)
+        self.switch_auto_capture.pack(side="left", padx=5, pady=5)
+        
+        self.bilevel_var = ctk.BooleanVar(value=self.document_processor.bilevel)
+        self.switch_bilevel = ctk.CTkSwitch(self.control_frame, text="B&W Text", variable=self.bilevel_var, command=self.toggle_bilevel)
+        self.switch_bilevel.pack(side="left", padx=5, pady=5)
         #____________________________________________________________________________________________________________________
         # Status label
         self.status_var = ctk.StringVar(value="Ready. Point camera at a document.")
@@ -103,142 +185,303 @@ class DocumentScannerUI:
         self.document_indicator = ctk.CTkLabel(self.control_frame, textvariable=self.document_indicator_var, text_color="#FF5555")
         self.document_indicator.pack(side="right", padx=5, pady=5)
         
+        # Import and export progress, only shown while one is running
+        self.progress_bar = ctk.CTkProgressBar(self.control_frame, width=120)
+        self.progress_bar.set(0)
+        
+        # Frame rate readout for the capture, detection and display stages
+        self.fps_var = ctk.StringVar(value="")
+        self.fps_label = ctk.CTkLabel(self.control_frame, textvariable=self.fps_var, text_color="#AAAAAA")
+        self.fps_label.pack(side="right", padx=5, pady=5)
+        
         # Configure grid weights
         self.main_frame.columnconfigure(0, weight=1)
         self.main_frame.columnconfigure(1, weight=1)
+        self.main_frame.columnconfigure(2, weight=1)
         self.main_frame.rowconfigure(0, weight=1)
+        
+        self.select_camera(self.active, announce=False)
+    
+    def select_camera(self, camera, announce=True):
+        # Capture, the indicator and the rectified view follow this camera
+        self.active = camera
+        if len(self.station.cameras) > 1:
+            for other, canvas in zip(self.station.cameras, self.canvases):
+                canvas.configure(highlightbackground="#2CC985" if other is camera else "#1A1A1A")
+            self.camera_title.configure(text=f"Camera Feed - {camera.name}")
+        # Show this camera's page straight away, not the previous camera's
+        result = camera.latest_result
+        if result is not None:
+            self.update_indicator(result["is_document_detected"])
+            self.render_rectified(result["original"], result["document_corners"])
+        else:
+            self.rectified_renderer.clear()
+        if announce:
+            self.status_var.set(f"{camera.name} selected.")
     
     def update_video(self):
         
-        frame = self.camera_manager.get_frame()
-        
-        if frame is not None:
-            # Process the frame to detect documents
-            processed_frame, original_frame = self.camera_manager.process_frame(frame)
-            
-            # Get canvas dimensions
-            canvas_width = self.canvas.winfo_width()
-            canvas_height = self.canvas.winfo_height()
-            
-            # Skip first few frames until canvas is properly sized
-            if canvas_width > 1 and canvas_height > 1:
-                # Resize the frame to fit the canvas while maintaining aspect ratio
-                img_height, img_width = processed_frame.shape[:2]
-                scale = min(canvas_width/img_width, canvas_height/img_height)
-                new_width = int(img_width * scale)
-                new_height = int(img_height * scale)
-                
-                resized_frame = cv2.resize(processed_frame, (new_width, new_height))
-                
-                # Convert to RGB for tkinter
-                self.photo = PIL.ImageTk.PhotoImage(
-                    image=PIL.Image.fromarray(cv2.cvtColor(resized_frame, cv2.COLOR_BGR2RGB))
-                )
-                
-                # Center the image in canvas
-                x_offset = (canvas_width - new_width) // 2
-                y_offset = (canvas_height - new_height) // 2
-                
-                # Clear canvas and add new image
-                self.canvas.delete("all")
-                self.canvas.create_image(x_offset, y_offset, image=self.photo, anchor="nw")
+        if self.station.threaded:
+            for camera in self.station.cameras:
+                self.update_camera(camera)
+            self.update_fps()
+            if not self.first_frame_shown:
+                self.update_camera_state()
+        else:
+            camera = self.active
+            camera_manager = camera.camera_manager
+            frame = camera_manager.get_frame()
             
-            # Update document detection indicator
-            if self.camera_manager.is_document_detected:
-                self.document_indicator_var.set("Document detected")
-                self.document_indicator.configure(text_color="#55FF55")
-            else:
-                self.document_indicator_var.set("No document detected")
-                self.document_indicator.configure(text_color="#FF5555")
+            if frame is not None:
+                # Process the frame to detect documents
+                processed_frame, original_frame = camera_manager.process_frame(frame, annotate=False)
+                self.render_frame(processed_frame, camera_manager.document_corners, camera)
+                self.first_frame()
+                self.render_rectified(original_frame, camera_manager.document_corners)
+                self.update_indicator(camera_manager.is_document_detected)
+                self.check_auto_capture(camera, original_frame, camera_manager.document_corners)
+            elif not self.first_frame_shown:
+                self.update_camera_state()
+        
+        # Pick up pages finished by the processing workers
+        self.collect_pages()
+        if self.importer is not None:
+            self.collect_imports()
+        if self.pdf_export is not None:
+            self.collect_export()
         
         self.window.after(self.delay, self.update_video)
     
-    def capture_image(self):
-        
-        if self.camera_manager.current_image is not None:
-            try:
-                self.status_var.set("Processing image...")
-                
-                # Get the current image regardless of document detection
-                captured_image = self.camera_manager.current_image.copy()
-                
-                # If document is detected, try to process it, but don't require success
-                if self.camera_manager.is_document_detected and self.camera_manager.document_corners is not None:
-                    try:
-                        # Try to process document
-                        warped = self.document_processor.process_document(
-                            self.camera_manager.current_image,
-                            self.camera_manager.document_corners
-                        )
-                        
-                        # If successfully warped, use that
-                        if warped is not None:
-                            captured_image = warped
-                            self.status_var.set("Document captured and processed successfully.")
-                        else:
-                            # Use original image if warping failed
-                            self.status_var.set("Document detected but couldn't be processed. Using original image.")
-                    except Exception as e:
-                        # Use original image if processing raised an exception
-                        self.status_var.set(f"Document processing error:{e}. Using original image.")
-                else:
-                    # No document detected, just use the original image
-                    self.status_var.set("No document detected. Using captured image as-is.")
-                    
-                # Display the image (either warped or original)
-                self.display_preview(captured_image)
-                
-                # Enable the add to PDF button
-                self.btn_add_to_pdf.configure(state="normal")
-                
-            except Exception as e:
-                self.status_var.set(f"Error capturing image:{e}")
+    def update_camera(self, camera):
+        # Only pick up the latest finished result; never wait on the camera
+        result = camera.capture_pipeline.get_result()
+        if result is None:
+            return
+        # Frames are pooled; hand the previous one back
+        camera.release_result()
+        camera.latest_result = result
+        self.render_frame(result["frame"], result["document_corners"], camera)
+        self.first_frame()
+        if camera is self.active:
+            self.render_rectified(result["original"], result["document_corners"])
+            self.update_indicator(result["is_document_detected"])
+        self.check_auto_capture(camera, result["original"], result["document_corners"])
     
-    def display_preview(self, image):
-        
-        # Get canvas dimensions
-        canvas_width = self.preview_canvas.winfo_width()
-        canvas_height = self.preview_canvas.winfo_height()
-        
-        # Skip if canvas is not properly sized yet
-        if canvas_width <= 1 or canvas_height <= 1:
-            # Use default sizes as fallback
-            canvas_width = 480
-            canvas_height = 678
-            
-        # Get image dimensions
-        h, w = image.shape[:2]
-        
-        # Calculate A4 aspect ratio (1:√2)
-        a4_ratio = 1 / 1.414
-        
-        # Determine if we should constrain by width or height
-        if canvas_width / canvas_height < w / h:
-            # Constrain by width
-            new_w = canvas_width
-            new_h = int(new_w * h / w)
+    def render_frame(self, processed_frame, document_corners=None, camera=None):
+        
+        # Resize into the camera's tile, keeping the aspect ratio, reusing buffers;
+        # the contour is drawn on the resized copy so the frame stays clean
+        camera = camera or self.active
+        self.frame_corners = document_corners
+        self.frame_stats = self.show_stats and camera is self.active
+        self.video_renderers[camera.index].render(processed_frame, overlay=self.draw_overlay)
+    
+    def render_rectified(self, frame, document_corners):
+        # Flatten the page at preview resolution with cached remap tables
+        page = self.rectified_preview.render(frame, document_corners)
+        if page is not None:
+            self.rectified_renderer.render(page)
         else:
-            # Constrain by height
-            new_h = canvas_height
-            new_w = int(new_h * w / h)
-            
-        # Resize image
-        resized_img = cv2.resize(image, (new_w, new_h))
+            # No page in view; don't leave the last one up
+            self.rectified_renderer.clear()
+    
+    def draw_overlay(self, resized_frame, scale):
+        if self.frame_corners is not None:
+            # Draw the document contour in green
+            contour = np.round(self.frame_corners.reshape(-1, 1, 2) * scale).astype(np.int32)
+            cv2.drawContours(resized_frame, [contour], -1, (0, 255, 0), 2)
+        if self.frame_stats and resized_frame.ndim == 3:
+            profiler.draw_overlay(resized_frame)
+    
+    def toggle_auto_capture(self):
+        for camera in self.station.cameras:
+            camera.auto_capture.reset()
+        if self.auto_capture_var.get():
+            self.status_var.set("Auto capture on. Hold each page still to capture it.")
+        else:
+            self.status_var.set("Auto capture off.")
+    
+    def toggle_bilevel(self):
+        # Applies to pages captured from now on
+        self.document_processor.bilevel = self.bilevel_var.get()
+        self.page_queue.update_settings(self.document_processor)
+        if self.bilevel_var.get():
+            self.status_var.set("Black and white pages will be stored as 1-bit images.")
+        else:
+            self.status_var.set("Black and white pages will be stored in grayscale.")
+    
+    def check_auto_capture(self, camera, frame, document_corners):
+        if not self.auto_capture_var.get():
+            return
+        if self.page_queue.is_full():
+            # Don't arm a capture that would be turned away
+            return
+        if camera.auto_capture.update(frame, document_corners):
+            # Capture and queue the page straight into the PDF
+            self.capture_image(add_to_pdf=True, camera=camera)
+    
+    def first_frame(self):
+        if self.first_frame_shown:
+            return
+        self.first_frame_shown = True
+        if self.on_first_frame is not None:
+            self.on_first_frame()
+    
+    def update_camera_state(self):
+        # Cameras open in the background; say so until frames arrive
+        if all(camera.camera_manager.camera_state == "failed" for camera in self.station.cameras):
+            self.document_indicator_var.set("Camera not available")
+            self.document_indicator.configure(text_color="#FF5555")
+        else:
+            self.document_indicator_var.set("Connecting to camera...")
+            self.document_indicator.configure(text_color="#FFCC55")
+    
+    def update_indicator(self, is_document_detected):
         
-        # Convert to RGB for tkinter
-        self.preview_photo = PIL.ImageTk.PhotoImage(
-            image=PIL.Image.fromarray(cv2.cvtColor(resized_img, cv2.COLOR_BGR2RGB))
+        # Update document detection indicator
+        if is_document_detected:
+            self.document_indicator_var.set("Document detected")
+            self.document_indicator.configure(text_color="#55FF55")
+        else:
+            self.document_indicator_var.set("No document detected")
+            self.document_indicator.configure(text_color="#FF5555")
+    
+    def update_fps(self):
+        if len(self.station.cameras) > 1:
+            # Detection rate and CPU per camera; the share is of all cameras together
+            self.fps_var.set(" | ".join(
+                f"{stats['name']}: {stats['detect']:.0f} FPS, CPU {stats['cpu_cores']:.0%} ({stats['cpu_share']:.0%})"
+                for stats in self.station.get_stats()
+            ))
+            return
+        camera_manager = self.active.camera_manager
+        capture_pipeline = self.active.capture_pipeline
+        fps = capture_pipeline.get_fps()
+        text = f"Capture {fps['capture']:.1f} | Detect {fps['detect']:.1f} | Display {fps['display']:.1f} FPS"
+        text += f" | CPU {capture_pipeline.get_cpu()['cpu_cores']:.0%}"
+        if camera_manager.motion_gating:
+            gate = camera_manager.motion_gate.get_stats()
+            text += f" | Skipped {gate['skipped_frames']} ({gate['skip_ratio']:.0%})"
+        still = camera_manager.get_still_stats()
+        if still is not None:
+            text += f" | Still switch {still['mean_ms']:.0f} ms"
+        self.fps_var.set(text)
+    
+    def toggle_stats(self, event=None):
+        # The overlay needs timings, so showing it turns the profiler on
+        self.show_stats = not self.show_stats
+        if self.show_stats:
+            profiler.enabled = True
+        self.status_var.set("Timing overlay on (F4 to export)." if self.show_stats else "Timing overlay off.")
+    
+    def export_stats(self, event=None):
+        if not profiler.get_stats():
+            self.status_var.set("No timings recorded. Press F3 to start profiling.")
+            return
+        filename = filedialog.asksaveasfilename(
+            title="Export Timings",
+            filetypes=(("JSON files", "*.json"), ("CSV files", "*.csv")),
+            defaultextension=".json"
         )
-
-        # Clear canvas
-        self.preview_canvas.delete("all")
+        if filename:
+            profiler.dump(filename)
+            self.status_var.set(f"Timings exported: {os.path.basename(filename)}")
+    
+    def get_capture_source(self, camera):
+        """Return the camera's frame to capture along with its detection state"""
+        if camera.capture_pipeline is not None:
+            result = camera.latest_result
+            if result is None:
+                return None, False, None
+            return result["original"], result["is_document_detected"], result["document_corners"]
+        return (
+            camera.camera_manager.current_image,
+            camera.camera_manager.is_document_detected,
+            camera.camera_manager.document_corners,
+        )
+    
+    def get_still(self, camera):
+        """Full-resolution still for the frame being captured, a future of one, or None"""
+        camera_manager = camera.camera_manager
+        if camera_manager.still_resolution is None:
+            return None
+        if camera_manager.still_mode == "buffered":
+            if camera.capture_pipeline is not None:
+                return camera.latest_result["still"] if camera.latest_result is not None else None
+            return camera_manager.current_still
+        # Switch mode: the capture thread owns the camera
+        if camera.capture_pipeline is not None:
+            return camera.capture_pipeline.request_still()
+        return camera_manager.grab_still()
+    
+    def capture_image(self, add_to_pdf=False, camera=None):
+        
+        # Capture button and auto capture of the active camera, or of the given one
+        camera = camera or self.active
+        current_image, is_document_detected, document_corners = self.get_capture_source(camera)
+        
+        if current_image is not None:
+            corners = document_corners if is_document_detected else None
+            if self.page_queue.is_full():
+                self.status_var.set(f"Still processing {self.page_queue.in_flight()} pages. Try again in a moment.")
+                return False
+            # Pages come back from the queue, and go into the PDF, in capture order
+            # whichever camera took them
+            context = {"source": "camera", "add_to_pdf": add_to_pdf, "camera": camera.name}
+            # The page is warped from the full-resolution still when there is one
+            still = self.get_still(camera)
+            # Live frames are pooled buffers that get reused; capture is the one place they are copied
+            current_image = current_image.copy()
+            if isinstance(still, np.ndarray):
+                still = still.copy()
+            if self.page_queue.submit(current_image, corners, still=still, context=context) is None:
+                self.status_var.set(f"Still processing {self.page_queue.in_flight()} pages. Try again in a moment.")
+                return False
+            self.status_var.set(f"Processing image... ({self.page_queue.in_flight()} in queue)")
+            return True
+        return False
+    
+    def collect_pages(self):
+        for page, status, context in self.page_queue.poll():
+            self.on_page_ready(page, status, context)
+    
+    def on_page_ready(self, page, status, context):
+        if page is None:
+            if status == "unreadable":
+                self.status_var.set("Failed to load image.")
+            else:
+                self.status_var.set("Error processing image.")
+            return
         
-        # Center the image in canvas
-        x_offset = (canvas_width - new_w) // 2
-        y_offset = (canvas_height - new_h) // 2
+        uploaded = context["source"] == "file"
+        if status == "processed":
+            self.status_var.set("Document detected and processed successfully." if uploaded
+                                else "Document captured and processed successfully.")
+        elif status == "failed":
+            self.status_var.set("Document detected but couldn't be processed. Using original image.")
+        else:
+            self.status_var.set("No document detected in uploaded image. Using image as-is." if uploaded
+                                else "No document detected. Using captured image as-is.")
+        
+        # Display the image (either warped or original)
+        self.document_processor.processed_image = page
+        self.display_preview(page)
+        
+        if context["add_to_pdf"]:
+            if self.pdf_manager.add_image(page):
+                text = f"Added to PDF. Total pages: {self.pdf_manager.get_image_count()}"
+                if len(self.station.cameras) > 1:
+                    text = f"{context['camera']}: {text}"
+                self.status_var.set(text)
+            self.btn_add_to_pdf.configure(state="disabled")
+        else:
+            # Enable the add to PDF button
+            self.btn_add_to_pdf.configure(state="normal")
+    
+    def display_preview(self, image):
         
-        # Draw image centered in canvas
-        self.preview_canvas.create_image(x_offset, y_offset, image=self.preview_photo, anchor="nw")
+        # Fit the page into the preview canvas, centred
+        self.preview_renderer.render(image)
     
     def add_to_pdf(self):
         if self.document_processor.processed_image is not None:
@@ -247,76 +490,94 @@ class DocumentScannerUI:
                 self.btn_add_to_pdf.configure(state="disabled")
     
     def clear_images(self):
+        if self.pdf_manager.is_exporting():
+            self.status_var.set("Wait for the PDF to be written first.")
+            return
+        if self.importer is not None:
+            # Drop the rest of the import along with the pages
+            self.importer.cancel()
+            self.importer = None
+            self.progress_bar.pack_forget()
         self.pdf_manager.clear_all_images()
         self.status_var.set(f"Successfully cleared all pages! Total pages: {self.pdf_manager.get_image_count()}")
     
     def remove_top(self):
+        if self.pdf_manager.is_exporting():
+            self.status_var.set("Wait for the PDF to be written first.")
+            return
         if self.pdf_manager.remove_last_image():
             self.status_var.set(f"Image successfully removed. Total pages: {self.pdf_manager.get_image_count()}")
         else:
             self.status_var.set("No images to remove.")
     
     def add_from_local(self):
-        file_path = filedialog.askopenfilename(
+        file_paths = filedialog.askopenfilenames(
             initialdir="/",
-            title="Select Image",
+            title="Select Images",
             filetypes=(("Image files", "*.jpg;*.jpeg;*.png"), ("all files", "*.*"))
         )
         
-        if file_path:
-            try:
-                # Read image
-                img = cv2.imread(file_path)
-                if img is not None:
-                    self.status_var.set("Processing uploaded image...")
-                    
-                    # Attempt to detect document in the uploaded image
-                    # Create a temporary copy in the camera manager to use its detection logic
-                    original_image = self.camera_manager.current_image
-                    self.camera_manager.current_image = img.copy()
-                    
-                    # Process the frame to detect documents (reusing camera manager's detection)
-                    _, _ = self.camera_manager.process_frame_local(img)
-                    
-                    # Get the current image regardless of document detection
-                    captured_image = img.copy()
-                    
-                    # If document is detected, try to process it
-                    if self.camera_manager.is_document_detected and self.camera_manager.document_corners is not None:
-                        try:
-                            # Try to process document
-                            warped = self.document_processor.process_document(
-                                img,
-                                self.camera_manager.document_corners
-                            )
-                            
-                            # If successfully warped, use that
-                            if warped is not None:
-                                captured_image = warped
-                                self.status_var.set("Document detected and processed successfully.")
-                            else:
-                                # Use original image if warping failed
-                                self.status_var.set("Document detected but couldn't be processed. Using original image.")
-                        except Exception as e:
-                            # Use original image if processing raised an exception
-                            self.status_var.set(f"Document processing error: {e}. Using original image.")
-                    else:
-                        # No document detected, just use the original image
-                        self.status_var.set("No document detected in uploaded image. Using image as-is.")
-                    
-                    # Restore the original camera image
-                    self.camera_manager.current_image = original_image
-                    
-                    # Display the processed image and enable the add button
-                    self.document_processor.processed_image = captured_image
-                    self.display_preview(captured_image)
-                    self.btn_add_to_pdf.configure(state="normal")
-                else:
-                    self.status_var.set("Failed to load image.")
-            except Exception as e:
-                self.status_var.set(f"Error loading image: {e}")
+        if len(file_paths) == 1:
+            # Loading, detection and processing all happen in a worker
+            context = {"source": "file", "add_to_pdf": False}
+            if self.page_queue.submit(path=file_paths[0], detect=True, context=context) is None:
+                self.status_var.set(f"Still processing {self.page_queue.in_flight()} pages. Try again in a moment.")
+            else:
+                self.status_var.set("Processing uploaded image...")
+        elif file_paths:
+            self.start_import(file_paths)
+    
+    def add_folder(self):
+        directory = filedialog.askdirectory(initialdir="/", title="Select Folder")
+        if directory:
+            paths = collect_images([directory])
+            if paths:
+                self.start_import(paths)
+            else:
+                self.status_var.set("No images found in folder.")
+    
+    def start_import(self, paths):
+        if self.importer is not None or self.pdf_export is not None:
+            self.status_var.set("Wait for the running import or export to finish.")
+            return
+        # Pages go straight into the PDF, in the order they were selected
+        settings = self.document_processor.get_settings()
+        self.importer = FileImporter(paths, preset=settings["preset"], cache_dir=settings["cache_dir"], bilevel=settings["bilevel"])
+        self.importer.start()
+        self.progress_bar.set(0)
+        self.progress_bar.pack(side="left", padx=5, pady=5)
+        self.status_var.set(f"Importing {len(paths)} images...")
+    
+    def collect_imports(self):
+        # A couple of pages per tick keeps the live view responsive. While
+        # captures are still waiting for the encoders, leave the imported
+        # pages with the importer, which then holds back its workers
+        store = self.pdf_manager.captured_images
+        if store.pending() < store.max_pending:
+            for path, encoded, detected in self.importer.poll(max_pages=2):
+                if encoded is not None:
+                    self.pdf_manager.add_encoded_image(*encoded)
+        
+        progress = self.importer.get_progress()
+        self.progress_bar.set(progress["fraction"])
+        
+        if self.importer.is_done():
+            text = f"Imported {progress['done'] - progress['failed']}/{progress['total']} images. Total pages: {self.pdf_manager.get_image_count()}"
+            if progress["failed"]:
+                text += f" ({progress['failed']} could not be read)"
+            self.status_var.set(text)
+            self.progress_bar.pack_forget()
+            self.importer = None
+        else:
+            self.status_var.set(f"Importing {progress['done']}/{progress['total']} - {progress['pages_per_second']:.1f} pages/s")
     
     def create_pdf(self):
+        if self.importer is not None:
+            self.status_var.set("Wait for the import to finish before creating the PDF.")
+            return
+        if self.pdf_export is not None:
+            self.status_var.set("A PDF is already being created.")
+            return
         if self.pdf_manager.get_image_count() == 0:
             self.status_var.set("No images captured. Capture some documents first.")
             return
@@ -332,11 +593,30 @@ class DocumentScannerUI:
         if not filename:
             return
         
-        if self.pdf_manager.create_pdf(filename):
-            self.status_var.set(f"PDF created successfully: {os.path.basename(filename)}")
+        # Pages were encoded as they were added; this only writes them out
+        if self.pdf_manager.create_pdf_async(filename) is None:
+            self.status_var.set("A PDF is already being created.")
+            return
+        self.pdf_export = os.path.basename(filename)
+        self.progress_bar.set(0)
+        self.progress_bar.pack(side="left", padx=5, pady=5)
+        self.status_var.set(f"Creating PDF: {self.pdf_export}...")
+    
+    def collect_export(self):
+        self.progress_bar.set(self.pdf_manager.get_export_progress())
+        if self.pdf_manager.is_exporting():
+            return
+        if self.pdf_manager.finish_export():
+            self.status_var.set(f"PDF created successfully: {self.pdf_export}")
         else:
             self.status_var.set("Error creating PDF.")
+        self.progress_bar.pack_forget()
+        self.pdf_export = None
     
     def on_closing(self):
-        self.camera_manager.release()
+        if self.importer is not None:
+            self.importer.cancel()
+        self.page_queue.shutdown()
+        # Stops every camera's threads, then releases the cameras
+        self.station.release()
         self.window.destroy()
\ No newline at end of file
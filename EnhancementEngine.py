@@ -0,0 +1,371 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import numpy as np
+
+# Named enhancement presets.
+#   contrast:        "clahe" for local contrast, "lut" for a global stretch via lookup table
+#   classify_step:   sample every Nth pixel in each direction when classifying colour
+#   bw_threshold:    average channel difference below which a page is treated as grayscale
+#   tint_threshold:  below this the page is "mostly B&W" and gets the light colour treatment
+#   lab_boost:       a/b channel gain in Lab space for colour pages (None to skip)
+#   budget_ms_per_mp: latency budget in milliseconds per megapixel of input
+PRESETS = {
+    "fast": {
+        "contrast": "lut",
+        "lut_clip_percent": 1.0,
+        "clahe_clip": None,
+        "clahe_grid": None,
+        "denoise": False,
+        "sharpen_sigma": 1.0,
+        "sharpen_amount": 0.1,
+        "classify_step": 4,
+        "bw_threshold": 3,
+        "tint_threshold": 10,
+        "tint_saturation": 1.2,
+        "colour_saturation": 1.1,
+        "value_blend": 0.6,
+        "lab_boost": None,
+        "budget_ms_per_mp": 20.0,
+    },
+    "balanced": {
+        "contrast": "clahe",
+        "lut_clip_percent": None,
+        "clahe_clip": 1.5,
+        "clahe_grid": (8, 8),
+        "denoise": False,
+        "sharpen_sigma": 2.0,
+        "sharpen_amount": 0.1,
+        "classify_step": 1,
+        "bw_threshold": 3,
+        "tint_threshold": 10,
+        "tint_saturation": 1.2,
+        "colour_saturation": 1.1,
+        "value_blend": 0.6,
+        "lab_boost": 1.05,
+        "budget_ms_per_mp": 75.0,
+    },
+    "archival": {
+        "contrast": "clahe",
+        "lut_clip_percent": None,
+        "clahe_clip": 1.2,
+        "clahe_grid": (16, 16),
+        "denoise": True,
+        "sharpen_sigma": 1.5,
+        "sharpen_amount": 0.15,
+        "classify_step": 1,
+        "bw_threshold": 2,
+        "tint_threshold": 10,
+        "tint_saturation": 1.0,
+        "colour_saturation": 1.0,
+        "value_blend": 0.5,
+        "lab_boost": None,
+        "budget_ms_per_mp": 150.0,
+    },
+}
+
+# Tiled enhancement: bands are at least this many rows, and the extra rows a
+# band reads on each side for the bilateral filter (d=5) and the adaptive
+# threshold (15x15 block)
+MIN_BAND_ROWS = 64
+BILATERAL_HALO = 3
+THRESHOLD_HALO = 8
+
+# Thread pools shared by all engines, keyed by process and size
+_tile_executors = {}
+_tile_lock = threading.Lock()
+
+def get_tile_executor(threads):
+    # Keyed by pid too: a forked worker must not reuse its parent's pool
+    key = (os.getpid(), threads)
+    with _tile_lock:
+        executor = _tile_executors.get(key)
+        if executor is None:
+            executor = _tile_executors[key] = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="tile")
+        return executor
+
+class EnhancementEngine:
+    """
+    Gives captured pages the scanned look using one of the named PRESETS.
+
+    Intermediate images are kept in buffers that are reused from one call to
+    the next while the page size stays the same; only the returned page is
+    newly allocated. An engine is not thread-safe, use one per thread.
+
+    With tile_threads above 1, pages of at least min_tile_pixels are split
+    into horizontal bands enhanced in parallel on a shared thread pool
+    (OpenCV releases the GIL). Filters read overlapping rows beyond their
+    band, so the bands stitch without seams and the result is identical to
+    the whole-page one. CLAHE still runs as one call.
+    """
+
+    def __init__(self, preset="balanced", tile_threads=1, min_tile_pixels=4000000):
+        self.buffers = {}
+        self.tile_threads = tile_threads
+        self.min_tile_pixels = min_tile_pixels
+        self.set_preset(preset)
+
+    def set_preset(self, preset):
+        if preset not in PRESETS:
+            raise ValueError(f"Unknown enhancement preset: {preset}")
+        self.preset = preset
+        self.params = PRESETS[preset]
+
+        params = self.params
+        self.clahe = None
+        if params["contrast"] == "clahe":
+            self.clahe = cv2.createCLAHE(clipLimit=params["clahe_clip"], tileGridSize=params["clahe_grid"])
+
+        # Per-channel lookup tables replace the numpy and addWeighted channel
+        # arithmetic; they are built with the same operations so results match
+        ramp = np.arange(256, dtype=np.uint8)
+        identity = ramp.reshape(1, 256)
+        self.tint_lut = self.make_hsv_lut(identity, params["tint_saturation"])
+        self.colour_lut = self.make_hsv_lut(identity, params["colour_saturation"])
+        self.lab_lut = None
+        if params["lab_boost"] is not None:
+            boosted = cv2.addWeighted(ramp, params["lab_boost"], ramp, 0, 0).reshape(1, 256)
+            self.lab_lut = np.dstack([identity, boosted, boosted])
+
+    def make_hsv_lut(self, identity, saturation):
+        ramp = np.arange(256, dtype=np.float64)
+        saturated = np.clip(ramp * saturation, 0, 255).astype(np.uint8).reshape(1, 256)
+        return np.dstack([identity, saturated, identity])
+
+    def buffer(self, name, shape):
+        """Return a reusable uint8 buffer, reallocating only when the shape changes"""
+        buf = self.buffers.get(name)
+        if buf is None or buf.shape != shape:
+            buf = np.empty(shape, dtype=np.uint8)
+            self.buffers[name] = buf
+        return buf
+
+    def enhance(self, image, bilevel=False):
+        """
+        Return the enhanced page as a new BGR or grayscale image. With
+        bilevel, black and white pages come back thresholded to 0 and 255.
+        """
+        params = self.params
+        height, width = image.shape[:2]
+        plane = (height, width)
+        bands = self.get_bands(height, width)
+
+        # Convert to grayscale
+        if image.ndim == 2:
+            gray = image
+        else:
+            gray = self.buffer("gray", plane)
+            self.run_bands(bands, self.gray_rows, image, gray)
+
+        if params["denoise"]:
+            # Edge-preserving smoothing keeps strokes crisp while removing sensor noise
+            denoised = self.buffer("denoised", plane)
+            self.run_bands(bands, self.denoise_rows, gray, denoised)
+            gray = denoised
+
+        # Decide whether to return grayscale or color based on document type
+        avg_diff = self.colour_difference(image, bands)
+        bw_page = avg_diff < params["bw_threshold"]
+
+        if bw_page and bilevel:
+            # Local threshold keeps text crisp under uneven lighting
+            binary = np.empty(plane, dtype=np.uint8)
+            self.run_bands(bands, self.threshold_rows, gray, binary)
+            return binary
+
+        # Improve contrast with moderation. CLAHE's tile histograms span the
+        # whole page, so it always runs as one call (OpenCV parallelises it)
+        enhanced = self.buffer("enhanced", plane)
+        if params["contrast"] == "clahe":
+            self.clahe.apply(gray, dst=enhanced)
+        else:
+            self.run_bands(bands, self.lut_rows, gray, self.contrast_lut(gray), enhanced)
+
+        # A grayscale page is returned directly, so it gets its own array
+        page = np.empty(plane if bw_page else image.shape, dtype=np.uint8)
+        self.run_bands(bands, self.finish_rows, image, enhanced, avg_diff, page)
+        return page
+
+    def get_bands(self, height, width):
+        """Row ranges [(y0, y1)] to enhance in parallel; one for small pages or with tiling off"""
+        if self.tile_threads <= 1 or height * width < self.min_tile_pixels:
+            return [(0, height)]
+        count = min(self.tile_threads, max(1, height // MIN_BAND_ROWS))
+        return [(height * i // count, height * (i + 1) // count) for i in range(count)]
+
+    def run_bands(self, bands, func, *args):
+        """Call func(index, y0, y1, *args) for every band, on the tile threads if there are several"""
+        if len(bands) == 1:
+            return [func(0, *bands[0], *args)]
+        executor = get_tile_executor(self.tile_threads)
+        futures = [executor.submit(func, index, y0, y1, *args) for index, (y0, y1) in enumerate(bands)]
+        return [future.result() for future in futures]
+
+    def filter_rows(self, name, index, src, y0, y1, halo, apply, dst=None):
+        """
+        Run a neighbourhood filter for rows y0:y1 of src and return the result
+        for those rows, written into dst if given. halo extra rows, at least
+        the kernel radius, are read on each side so band edges come out as in
+        the whole image; at the image border the band ends with the image and
+        the border is extrapolated the same way.
+        """
+        top = max(0, y0 - halo)
+        bottom = min(src.shape[0], y1 + halo)
+        if dst is not None and top == y0 and bottom == y1:
+            apply(src[y0:y1], dst[y0:y1])
+            return dst[y0:y1]
+        filtered = self.buffer(f"{name}_{index}", (bottom - top,) + src.shape[1:])
+        apply(src[top:bottom], filtered)
+        if dst is None:
+            return filtered[y0 - top:y1 - top]
+        dst[y0:y1] = filtered[y0 - top:y1 - top]
+        return dst[y0:y1]
+
+    def gray_rows(self, index, y0, y1, image, gray):
+        cv2.cvtColor(image[y0:y1], cv2.COLOR_BGR2GRAY, dst=gray[y0:y1])
+
+    def denoise_rows(self, index, y0, y1, gray, denoised):
+        self.filter_rows("denoised", index, gray, y0, y1, BILATERAL_HALO,
+                         lambda src, dst: cv2.bilateralFilter(src, 5, 20, 5, dst=dst), dst=denoised)
+
+    def threshold_rows(self, index, y0, y1, gray, binary):
+        self.filter_rows("binary", index, gray, y0, y1, THRESHOLD_HALO,
+                         lambda src, dst: cv2.adaptiveThreshold(src, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                                                                cv2.THRESH_BINARY, 15, 5, dst=dst), dst=binary)
+
+    def lut_rows(self, index, y0, y1, gray, lut, enhanced):
+        cv2.LUT(gray[y0:y1], lut, dst=enhanced[y0:y1])
+
+    def finish_rows(self, index, y0, y1, image, enhanced, avg_diff, page):
+        """Sharpening and colour stages for rows y0:y1, written into page"""
+        params = self.params
+        rows = slice(y0, y1)
+        plane = (y1 - y0, enhanced.shape[1])
+        bw_page = page.ndim == 2
+
+        # Unsharp mask; the blur reads a few rows beyond the band
+        sigma = params["sharpen_sigma"]
+        blurred = self.filter_rows("blurred", index, enhanced, y0, y1, int(np.ceil(4 * sigma)) + 1,
+                                   lambda src, dst: cv2.GaussianBlur(src, (0, 0), sigma, dst=dst))
+        sharpened = page[rows] if bw_page else self.buffer(f"sharpened_{index}", plane)
+        cv2.addWeighted(
+            enhanced[rows], 1 + params["sharpen_amount"], blurred, -params["sharpen_amount"], 0, dst=sharpened
+        )
+
+        if bw_page:
+            return
+
+        hsv = cv2.cvtColor(image[rows], cv2.COLOR_BGR2HSV, dst=self.buffer(f"hsv_{index}", plane + (3,)))
+        if avg_diff < params["tint_threshold"]:
+            # It has some color - boost saturation and use the sharpened gray as value
+            cv2.LUT(hsv, self.tint_lut, dst=hsv)
+            cv2.insertChannel(sharpened, hsv, 2)
+            cv2.cvtColor(hsv, cv2.COLOR_HSV2BGR, dst=page[rows])
+            return
+
+        # For color documents, boost saturation and blend the sharpened gray
+        # into the value channel to preserve color brightness relationships
+        cv2.LUT(hsv, self.colour_lut, dst=hsv)
+        value = cv2.extractChannel(hsv, 2, dst=self.buffer(f"value_{index}", plane))
+        blend = params["value_blend"]
+        cv2.addWeighted(value, 1 - blend, sharpened, blend, 0, dst=value)
+        cv2.insertChannel(value, hsv, 2)
+
+        if self.lab_lut is None:
+            cv2.cvtColor(hsv, cv2.COLOR_HSV2BGR, dst=page[rows])
+            return
+
+        # Final color boost - slightly increase color contrast in Lab space
+        color_enhanced = cv2.cvtColor(hsv, cv2.COLOR_HSV2BGR, dst=self.buffer(f"color_{index}", plane + (3,)))
+        lab = cv2.cvtColor(color_enhanced, cv2.COLOR_BGR2Lab, dst=self.buffer(f"lab_{index}", plane + (3,)))
+        cv2.LUT(lab, self.lab_lut, dst=lab)
+        cv2.cvtColor(lab, cv2.COLOR_Lab2BGR, dst=page[rows])
+
+    def contrast_lut(self, gray):
+        """Global contrast stretch between low and high percentiles of a subsample"""
+        step = self.params["classify_step"]
+        sample = np.ascontiguousarray(gray[::step, ::step])
+        hist = cv2.calcHist([sample], [0], None, [256], [0, 256]).ravel()
+        cdf = np.cumsum(hist) / max(1.0, hist.sum())
+
+        clip = self.params["lut_clip_percent"] / 100.0
+        low = int(np.searchsorted(cdf, clip))
+        high = int(np.searchsorted(cdf, 1.0 - clip))
+        if high <= low:
+            return np.arange(256, dtype=np.uint8)
+
+        ramp = (np.arange(256, dtype=np.float32) - low) * (255.0 / (high - low))
+        return np.clip(ramp, 0, 255).astype(np.uint8)
+
+    def colour_difference(self, image, bands=None):
+        """
+        Average absolute difference between the colour channels.
+
+        The mean of |b-g|, |b-r| and |g-r| equals 2/3 of the mean channel range
+        (max - min), which needs fewer passes over the image. Bands are summed
+        separately; the sums are exact, so the mean does not depend on them.
+        """
+        if image.ndim == 2:
+            return 0.0
+        step = self.params["classify_step"]
+        total = sum(self.run_bands(bands or [(0, image.shape[0])], self.channel_range_rows, image, step))
+        samples = -(-image.shape[0] // step) * -(-image.shape[1] // step)
+        # Same arithmetic as cv2.mean
+        return 2.0 * (total * (1.0 / samples)) / 3.0
+
+    def channel_range_rows(self, index, y0, y1, image, step):
+        """Sum of max - min over the channels of the sampled pixels in rows y0:y1"""
+        # Every step-th row of the image, counted from the top
+        start = -(-y0 // step) * step
+        image = image[start:y1:step, ::step]
+        if image.shape[0] == 0:
+            return 0.0
+        if step > 1:
+            image = np.ascontiguousarray(image)
+        plane = image.shape[:2]
+
+        b = cv2.extractChannel(image, 0, dst=self.buffer(f"channel_b_{index}", plane))
+        g = cv2.extractChannel(image, 1, dst=self.buffer(f"channel_g_{index}", plane))
+        r = cv2.extractChannel(image, 2, dst=self.buffer(f"channel_r_{index}", plane))
+        high = cv2.max(b, g, dst=self.buffer(f"channel_high_{index}", plane))
+        cv2.max(high, r, dst=high)
+        low = cv2.min(b, g, dst=b)
+        cv2.min(low, r, dst=low)
+        cv2.subtract(high, low, dst=high)
+        return cv2.sumElems(high)[0]
+
+    def evaluate(self, image, repeat=3):
+        """
+        Time this preset on an image and compare it with the balanced output.
+
+        Returns the best latency, the budget for this image size, whether the
+        preset is within budget and the mean absolute difference to the
+        balanced (reference) result.
+        """
+        self.enhance(image)  # warm up buffers
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = self.enhance(image)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+
+        megapixels = image.shape[0] * image.shape[1] / 1e6
+        budget_ms = self.params["budget_ms_per_mp"] * megapixels
+        reference = EnhancementEngine("balanced").enhance(image)
+        if reference.ndim != result.ndim:
+            # Compare in grayscale when one preset kept colour and the other did not
+            if reference.ndim == 3:
+                reference = cv2.cvtColor(reference, cv2.COLOR_BGR2GRAY)
+            else:
+                result = cv2.cvtColor(result, cv2.COLOR_BGR2GRAY)
+
+        return {
+            "preset": self.preset,
+            "latency_ms": best * 1000.0,
+            "budget_ms": budget_ms,
+            "within_budget": best * 1000.0 <= budget_ms,
+            "mean_abs_diff": float(cv2.absdiff(result, reference).mean()),
+        }
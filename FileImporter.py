@@ -0,0 +1,111 @@
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from BatchScanner import get_tile_threads, init_worker, ordered_map, scan_image
+
+class FileImporter:
+    """
+    Scans a list of image files on a process pool from a background thread.
+
+    Uses the same worker functions as BatchScanner. Pages come out in the
+    order of paths through poll(), which the UI calls from its loop.
+
+    max_in_memory caps the images alive at once: up to half of them are
+    being worked on, the rest are finished pages waiting in a queue for the
+    UI. Workers hand back pages already encoded for the PDF, so the queue
+    only holds compressed streams.
+    When the UI falls behind, the background thread stops submitting until
+    it catches up.
+    """
+
+    def __init__(self, paths, jobs=None, max_in_memory=None, preset="balanced", cache_dir=None, bilevel=False):
+        self.paths = list(paths)
+        self.jobs = jobs or os.cpu_count() or 1
+        self.max_in_memory = max(2, max_in_memory or self.jobs * 2)
+        # Finished pages waiting for the UI, and images submitted to the
+        # workers. The result the background thread is handing over counts
+        # against the window, since ordered_map only tops it up afterwards
+        self.queue_size = self.max_in_memory // 2
+        self.window = self.max_in_memory - self.queue_size
+        # No point in more workers than images in flight, or than images;
+        # cores left over enhance each large page in bands
+        self.jobs = max(1, min(self.jobs, self.window, len(self.paths)))
+        self.preset = preset
+        self.cache_dir = cache_dir
+        self.bilevel = bilevel
+
+        self.results = queue.Queue(maxsize=self.queue_size)
+        self.cancelled = threading.Event()
+        self.finished = threading.Event()
+        self.thread = None
+        self.error = None
+
+        # Progress, counted as pages are handed to the UI
+        self.done = 0
+        self.failed = []
+        self.start_time = None
+
+    def start(self):
+        self.start_time = time.perf_counter()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        # Forking copies the UI's threads and Tk state into the workers;
+        # spawn starts them from a clean interpreter instead
+        executor = ProcessPoolExecutor(max_workers=self.jobs, mp_context=multiprocessing.get_context("spawn"), initializer=init_worker, initargs=(self.preset, self.cache_dir, self.bilevel, get_tile_threads(self.jobs)))
+        try:
+            for result in ordered_map(executor, scan_image, self.paths, self.window):
+                # Wait for room in the queue, but give up promptly on cancel
+                while not self.cancelled.is_set():
+                    try:
+                        self.results.put(result, timeout=0.1)
+                        break
+                    except queue.Full:
+                        pass
+                if self.cancelled.is_set():
+                    break
+        except Exception as e:
+            print(f"Error importing images: {e}")
+            self.error = e
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            self.finished.set()
+
+    def poll(self, max_pages=None):
+        """
+        Return up to max_pages finished (path, encoded, detected) tuples, in
+        order. encoded is the (data, info) pair of encode_image, or None
+        when the image could not be read.
+        """
+        results = []
+        while max_pages is None or len(results) < max_pages:
+            try:
+                path, encoded, detected, _ = self.results.get_nowait()
+            except queue.Empty:
+                break
+            self.done += 1
+            if encoded is None:
+                self.failed.append(path)
+            results.append((path, encoded, detected))
+        return results
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def is_done(self):
+        return self.finished.is_set() and self.results.empty()
+
+    def get_progress(self):
+        elapsed = time.perf_counter() - self.start_time if self.start_time else 0.0
+        return {
+            "done": self.done,
+            "total": len(self.paths),
+            "failed": len(self.failed),
+            "fraction": self.done / len(self.paths) if self.paths else 1.0,
+            "pages_per_second": self.done / elapsed if elapsed > 0 else 0.0,
+        }
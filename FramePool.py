@@ -0,0 +1,78 @@
+import threading
+import numpy as np
+
+class FramePool:
+    """
+    Reusable frame buffers with reference counts.
+
+    acquire() hands out a free buffer of the requested shape with one
+    reference, allocating only while the pool holds fewer than capacity
+    buffers. Every holder of a frame releases it when done; at zero
+    references the buffer goes back to the pool. When every buffer is in
+    use, acquire() returns None and the caller allocates as usual, so a
+    slow consumer costs allocations, never stalls.
+    """
+
+    def __init__(self, capacity=6):
+        self.capacity = capacity
+        self.buffers = []
+        self.refs = {}
+        self.lock = threading.Lock()
+
+        # Counters
+        self.reused = 0
+        self.allocated = 0
+        self.exhausted = 0
+
+    def acquire(self, shape, dtype=np.uint8):
+        if shape is None:
+            return None
+        with self.lock:
+            for buf in self.buffers:
+                if self.refs[id(buf)] == 0 and buf.shape == shape and buf.dtype == dtype:
+                    self.refs[id(buf)] = 1
+                    self.reused += 1
+                    return buf
+
+            if len(self.buffers) >= self.capacity:
+                # Make room by dropping free buffers of another size
+                for buf in [b for b in self.buffers if self.refs[id(b)] == 0]:
+                    self.buffers.remove(buf)
+                    del self.refs[id(buf)]
+                if len(self.buffers) >= self.capacity:
+                    self.exhausted += 1
+                    return None
+
+            buf = np.empty(shape, dtype=dtype)
+            self.buffers.append(buf)
+            self.refs[id(buf)] = 1
+            self.allocated += 1
+            return buf
+
+    def retain(self, buf):
+        if buf is None:
+            return
+        with self.lock:
+            if id(buf) in self.refs:
+                self.refs[id(buf)] += 1
+
+    def release(self, buf):
+        if buf is None:
+            return
+        with self.lock:
+            # Frames that did not come from the pool are ignored
+            if id(buf) in self.refs and self.refs[id(buf)] > 0:
+                self.refs[id(buf)] -= 1
+
+    def in_use(self):
+        with self.lock:
+            return sum(1 for count in self.refs.values() if count > 0)
+
+    def get_stats(self):
+        return {
+            "buffers": len(self.buffers),
+            "in_use": self.in_use(),
+            "reused": self.reused,
+            "allocated": self.allocated,
+            "exhausted": self.exhausted,
+        }
@@ -0,0 +1,193 @@
+import os
+import time
+import cv2
+import numpy as np
+
+from SyntheticDocument import SyntheticDocumentGenerator
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff", ".webp")
+
+class FrameSource:
+    """
+    Base class for frame sources with a cv2.VideoCapture-like interface.
+
+    Subclasses implement next_frame(). With fps set, read() paces frames to
+    that rate; with fps=None frames are delivered as fast as possible. As
+    with VideoCapture.read, an image of the right size can be passed in to
+    be filled instead of allocating a new frame.
+    """
+
+    def __init__(self, fps=None):
+        self.fps = fps
+        self.frames_read = 0
+        self.exhausted = False
+        self._next_time = None
+
+    def pace(self):
+        if not self.fps:
+            return
+        now = time.perf_counter()
+        if self._next_time is None:
+            self._next_time = now
+        delay = self._next_time - now
+        if delay > 0:
+            time.sleep(delay)
+            self._next_time += 1.0 / self.fps
+        else:
+            # Running late: don't burst to catch up, restart the schedule
+            self._next_time = now + 1.0 / self.fps
+
+    def read(self, image=None):
+        self.pace()
+        frame = self.next_frame(image)
+        if frame is None:
+            return False, None
+        self.frames_read += 1
+        return True, frame
+
+    def next_frame(self, image=None):
+        raise NotImplementedError
+
+    def fill(self, frame, image):
+        """Copy a stored frame into image if it fits, else into a new array"""
+        if image is not None and image.shape == frame.shape and image.dtype == frame.dtype:
+            np.copyto(image, frame)
+            return image
+        return frame.copy()
+
+    def isOpened(self):
+        return True
+
+    def set(self, prop, value):
+        return False
+
+    def get(self, prop):
+        return 0.0
+
+    def release(self):
+        pass
+
+class CameraSource(FrameSource):
+    """Live camera through cv2.VideoCapture"""
+
+    def __init__(self, index=0, width=640, height=480, fps=None):
+        super().__init__(fps)
+        self.cap = cv2.VideoCapture(index)
+        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+
+    def next_frame(self, image=None):
+        ret, frame = self.cap.read(image)
+        return frame if ret else None
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def set(self, prop, value):
+        return self.cap.set(prop, value)
+
+    def get(self, prop):
+        return self.cap.get(prop)
+
+    def release(self):
+        if self.cap.isOpened():
+            self.cap.release()
+
+class VideoFileSource(FrameSource):
+    """Recorded session replayed from a video file"""
+
+    def __init__(self, path, fps=None, loop=False):
+        super().__init__(fps)
+        self.path = path
+        self.loop = loop
+        self.cap = cv2.VideoCapture(path)
+
+    def next_frame(self, image=None):
+        ret, frame = self.cap.read(image)
+        if not ret and self.loop and self.frames_read:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.cap.read(image)
+        if not ret:
+            self.exhausted = True
+            return None
+        return frame
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def get(self, prop):
+        return self.cap.get(prop)
+
+    def release(self):
+        if self.cap.isOpened():
+            self.cap.release()
+
+class ImageDirectorySource(FrameSource):
+    """Replays the images of a directory in name order"""
+
+    def __init__(self, directory, fps=None, loop=False, preload=False):
+        super().__init__(fps)
+        self.paths = sorted(
+            os.path.join(directory, name) for name in os.listdir(directory)
+            if name.lower().endswith(IMAGE_EXTENSIONS)
+        )
+        self.loop = loop
+        self.index = 0
+        # Preloading keeps image decoding out of the measured loop
+        self.frames = [cv2.imread(path) for path in self.paths] if preload else None
+
+    def next_frame(self, image=None):
+        if self.index >= len(self.paths):
+            if not self.loop or not self.paths:
+                self.exhausted = True
+                return None
+            self.index = 0
+        i = self.index
+        self.index += 1
+        if self.frames is not None:
+            # Hand out a copy: consumers may draw on frames
+            return self.fill(self.frames[i], image)
+        return cv2.imread(self.paths[i])
+
+    def isOpened(self):
+        return bool(self.paths)
+
+class SyntheticSource(FrameSource):
+    """Generated document frames with known corners, cycled endlessly"""
+
+    def __init__(self, width=640, height=480, fps=None, count=30, seed=0):
+        super().__init__(fps)
+        generator = SyntheticDocumentGenerator(seed)
+        # Rendering is much slower than detection, so render once up front
+        self.samples = [generator.generate(width, height, color=(i % 3 == 0)) for i in range(count)]
+        self.index = 0
+        self.corners = None
+
+    def next_frame(self, image=None):
+        frame, corners = self.samples[self.index % len(self.samples)]
+        self.index += 1
+        # Ground truth for the frame just returned
+        self.corners = corners
+        return self.fill(frame, image)
+
+def create_source(spec, fps=None, loop=True):
+    """
+    Build a frame source from a spec string:
+        camera[:INDEX]          live camera (default 0)
+        video:PATH              video file
+        images:DIRECTORY        image directory replay
+        synthetic[:WxH]         generated documents (default 640x480)
+    """
+    kind, _, arg = spec.partition(":")
+    if kind == "camera":
+        return CameraSource(int(arg) if arg else 0, fps=fps)
+    if kind == "video":
+        return VideoFileSource(arg, fps=fps, loop=loop)
+    if kind == "images":
+        return ImageDirectorySource(arg, fps=fps, loop=loop)
+    if kind == "synthetic":
+        width, height = 640, 480
+        if arg:
+            width, height = (int(v) for v in arg.lower().split("x"))
+        return SyntheticSource(width, height, fps=fps)
+    raise ValueError(f"Unknown frame source: {spec}")
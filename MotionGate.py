@@ -0,0 +1,64 @@
+import cv2
+
+class MotionGate:
+    """
+    Cheap change detector that lets static scenes skip document detection.
+
+    Each frame is shrunk to a tiny grayscale thumbnail and compared with the
+    thumbnail of the last frame that went through detection. When the mean
+    absolute difference stays below threshold, the previous detection
+    result can be reused. Detection is still forced every max_skipped frames
+    so slow drift and lighting changes are picked up eventually.
+    """
+
+    def __init__(self, threshold=3.0, thumbnail_size=(32, 24), max_skipped=30):
+        # Mean absolute gray-level difference (0-255) that counts as a change
+        self.threshold = threshold
+        self.thumbnail_size = thumbnail_size
+        self.max_skipped = max_skipped
+
+        self.reference = None
+        self.last_difference = 0.0
+        self.consecutive_skipped = 0
+
+        # Counters
+        self.processed_frames = 0
+        self.skipped_frames = 0
+
+    def make_thumbnail(self, frame):
+        # Shrink first so the colour conversion only touches a few hundred pixels
+        small = cv2.resize(frame, self.thumbnail_size, interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return small
+
+    def should_process(self, frame):
+        """True when the frame differs enough from the last processed one"""
+        thumbnail = self.make_thumbnail(frame)
+
+        changed = True
+        if self.reference is not None and self.consecutive_skipped < self.max_skipped:
+            self.last_difference = float(cv2.absdiff(thumbnail, self.reference).mean())
+            changed = self.last_difference > self.threshold
+
+        if changed:
+            self.reference = thumbnail
+            self.consecutive_skipped = 0
+            self.processed_frames += 1
+        else:
+            self.consecutive_skipped += 1
+            self.skipped_frames += 1
+        return changed
+
+    def reset(self):
+        self.reference = None
+        self.consecutive_skipped = 0
+
+    def get_stats(self):
+        total = self.processed_frames + self.skipped_frames
+        return {
+            "processed_frames": self.processed_frames,
+            "skipped_frames": self.skipped_frames,
+            "skip_ratio": self.skipped_frames / total if total else 0.0,
+            "last_difference": self.last_difference,
+        }
@@ -1,19 +1,34 @@
-import cv2
-from PIL import Image
-import os
+from concurrent.futures import ThreadPoolExecutor
+
+from PageStore import PageStore
+from PDFWriter import PDFWriter
+from Profiler import profiler
 
 class PDFManager:
     
-    def __init__(self):
-        self.captured_images = []
+    def __init__(self, spool_dir=None, encoding="jpeg", encode_workers=None):
+        # Pages are encoded in the background and spilled to disk as they are added; see PageStore
+        self.captured_images = PageStore(spool_dir, encoding=encoding, max_workers=encode_workers)
+        
+        # Background export state
+        self.export_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="export")
+        self.export_future = None
+        self.export_pages = []
+        self.export_done = 0
     
     def add_image(self, image):
         
         if image is not None:
-            self.captured_images.append(image.copy())
+            with profiler.stage("pdf.add_image"):
+                self.captured_images.append(image)
             return True
         return False
     
+    def add_encoded_image(self, data, info):
+        """Add a page encoded elsewhere, e.g. in a worker process; see encode_image"""
+        self.captured_images.append_encoded(data, info)
+        return True
+    
     def clear_all_images(self):
         
         self.captured_images.clear()
@@ -28,34 +43,57 @@ class PDFManager:
     def get_image_count(self):
         return len(self.captured_images)
     
+    def write_pdf(self, filename, pages):
+        """Copy the pre-encoded pages into a PDF, in order"""
+        try:
+            with profiler.stage("pdf.create_pdf"), PDFWriter(filename, resolution=100.0) as writer:
+                for page in pages:
+                    data, info = self.captured_images.read_encoded(page)
+                    writer.add_encoded_page(data, **info)
+                    self.export_done += 1
+            return True
+        except Exception as e:
+            print(f"Error creating PDF:{e}")
+            return False
+    
     def create_pdf(self, filename):
         
         if not self.captured_images:
             return False
         
-        try:
-            # Convert all images to PIL format
-            pil_images = []
-            for img in self.captured_images:
-                # Convert from BGR to RGB
-                rgb_img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-                pil_img = Image.fromarray(rgb_img)
-                pil_images.append(pil_img)
-            
-            # Save the first image as PDF and append the rest
-            if pil_images:
-                pil_images[0].save(
-                    filename, 
-                    "PDF", 
-                    resolution=100.0, 
-                    save_all=True,
-                    append_images=pil_images[1:] if len(pil_images) > 1 else []
-                )
-                
-                # Clear captured images after successful PDF creation
-                self.captured_images = []
-                return True
-            
-        except Exception as e:
-            print(f"Error creating PDF:{e}")
-            return False
\ No newline at end of file
+        self.export_done = 0
+        if not self.write_pdf(filename, self.captured_images.snapshot()):
+            return False
+        
+        # Clear captured images after successful PDF creation
+        self.captured_images.clear()
+        return True
+    
+    def create_pdf_async(self, filename):
+        """
+        Write the current pages to filename on a background thread and
+        return a future of the result. Pages may still be added meanwhile;
+        call finish_export() from the adding thread once it is done.
+        """
+        if not self.captured_images or self.is_exporting():
+            return None
+        self.export_pages = self.captured_images.snapshot()
+        self.export_done = 0
+        self.export_future = self.export_executor.submit(self.write_pdf, filename, self.export_pages)
+        return self.export_future
+    
+    def is_exporting(self):
+        return self.export_future is not None and not self.export_future.done()
+    
+    def get_export_progress(self):
+        """Fraction of the pages written by the running export"""
+        return self.export_done / len(self.export_pages) if self.export_pages else 0.0
+    
+    def finish_export(self):
+        """Drop the exported pages if the export succeeded. Returns its result"""
+        result = self.export_future.result()
+        if result:
+            self.captured_images.remove(self.export_pages)
+        self.export_future = None
+        self.export_pages = []
+        return result
@@ -0,0 +1,181 @@
+import io
+import os
+import zlib
+import cv2
+import numpy as np
+
+def is_bilevel(image):
+    """True for grayscale pages that only contain black and white"""
+    if image.ndim != 2 or image.dtype != np.uint8:
+        return False
+    # Any pixel strictly between 0 and 255 rules it out
+    return cv2.countNonZero(cv2.inRange(image, 1, 254)) == 0
+
+def encode_bilevel(image):
+    """
+    Encode a black and white page as CCITT Group 4, or as packed 1-bit
+    Flate when this Pillow cannot write G4 as a single strip.
+    Returns (data, info) like encode_image.
+    """
+    height, width = image.shape
+    info = {"width": width, "height": height, "color_space": "DeviceGray", "bits": 1}
+    try:
+        import PIL.Image
+        # Pillow's libtiff writer does the G4 coding; the PDF stream is the
+        # TIFF's single strip
+        buf = io.BytesIO()
+        PIL.Image.fromarray(image).convert("1").save(buf, "TIFF", compression="group4", strip_size=1 << 30)
+        tiff = PIL.Image.open(io.BytesIO(buf.getvalue()))
+        offsets, counts = tiff.tag_v2[273], tiff.tag_v2[279]
+        if len(offsets) == 1:
+            data = buf.getvalue()[offsets[0]:offsets[0] + counts[0]]
+            # libtiff codes 0 bits as white; with min-is-black data the runs are inverted
+            black_is_1 = "true" if tiff.tag_v2.get(262, 0) == 1 else "false"
+            info["filter_name"] = "CCITTFaxDecode"
+            info["decode_parms"] = f"<< /K -1 /Columns {width} /Rows {height} /BlackIs1 {black_is_1} >>"
+            return data, info
+    except Exception as e:
+        print(f"Error encoding page as CCITT G4: {e}")
+    # 1 bits are white in DeviceGray
+    info["filter_name"] = "FlateDecode"
+    info["decode_parms"] = None
+    return zlib.compress(np.packbits(image > 127, axis=1).data, 6), info
+
+def encode_image(image, encoding="jpeg", jpeg_quality=75, compression=6):
+    """
+    Encode a BGR or grayscale page as a PDF image stream.
+
+    "jpeg" gives a DCTDecode stream, "flate" a lossless FlateDecode one.
+    Black and white pages are always stored as 1-bit data, see encode_bilevel.
+    Returns (data, info) where info holds the add_encoded_page arguments.
+    """
+    if is_bilevel(image):
+        return encode_bilevel(image)
+    height, width = image.shape[:2]
+    color_space = "DeviceGray" if image.ndim == 2 else "DeviceRGB"
+    if encoding == "jpeg":
+        ok, data = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality])
+        if not ok:
+            raise ValueError("Could not encode page")
+        data = data.tobytes()
+        filter_name = "DCTDecode"
+    elif encoding == "flate":
+        # Raw samples, RGB order for colour pages
+        pixels = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        data = zlib.compress(np.ascontiguousarray(pixels).data, compression)
+        filter_name = "FlateDecode"
+    else:
+        raise ValueError(f"Unknown page encoding: {encoding}")
+    info = {
+        "width": width,
+        "height": height,
+        "color_space": color_space,
+        "filter_name": filter_name,
+        "bits": 8,
+        "decode_parms": None,
+    }
+    return data, info
+
+class PDFWriter:
+    """
+    Minimal PDF writer that streams pages straight to the file.
+
+    Each page is a single image; its encoded data is written as soon as the
+    page is added, so only one page needs to be in memory at a time. Pages
+    encoded ahead of time with encode_image are copied in as they are.
+    """
+
+    def __init__(self, filename, resolution=100.0, jpeg_quality=75):
+        self.filename = filename
+        # Pixels per inch used to size the page, as Pillow's resolution option
+        self.resolution = resolution
+        self.jpeg_quality = jpeg_quality
+
+        self.file = open(filename, "wb")
+        self.offsets = {}
+        self.page_ids = []
+        # Objects 1 and 2 are the catalog and page tree, written on close
+        self.next_id = 3
+
+        self.file.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def new_id(self):
+        obj_id = self.next_id
+        self.next_id += 1
+        return obj_id
+
+    def write_object(self, obj_id, body, stream=None):
+        self.offsets[obj_id] = self.file.tell()
+        self.file.write(f"{obj_id} 0 obj\n".encode("ascii"))
+        self.file.write(body)
+        if stream is not None:
+            self.file.write(b"\nstream\n")
+            self.file.write(stream)
+            self.file.write(b"\nendstream")
+        self.file.write(b"\nendobj\n")
+
+    def add_image(self, image):
+        """Encode a BGR or grayscale page as JPEG and write it"""
+        data, info = encode_image(image, "jpeg", self.jpeg_quality)
+        self.add_encoded_page(data, **info)
+
+    def add_encoded_page(self, data, width, height, color_space, filter_name, bits=8, decode_parms=None):
+        """Write a page from an already encoded image stream"""
+        image_id = self.new_id()
+        content_id = self.new_id()
+        page_id = self.new_id()
+
+        image_dict = (
+            f"<< /Type /XObject /Subtype /Image /Width {width} /Height {height} "
+            f"/ColorSpace /{color_space} /BitsPerComponent {bits} /Filter /{filter_name} "
+        )
+        if decode_parms:
+            image_dict += f"/DecodeParms {decode_parms} "
+        image_dict += f"/Length {len(data)} >>"
+        self.write_object(image_id, image_dict.encode("ascii"), data)
+
+        # Page size in points at the requested resolution
+        page_width = width * 72.0 / self.resolution
+        page_height = height * 72.0 / self.resolution
+        content = f"q {page_width:.4f} 0 0 {page_height:.4f} 0 0 cm /Im0 Do Q".encode("ascii")
+        self.write_object(content_id, f"<< /Length {len(content)} >>".encode("ascii"), content)
+
+        page = (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {page_width:.4f} {page_height:.4f}] "
+            f"/Resources << /XObject << /Im0 {image_id} 0 R >> >> /Contents {content_id} 0 R >>"
+        )
+        self.write_object(page_id, page.encode("ascii"))
+        self.page_ids.append(page_id)
+
+    def close(self):
+        kids = " ".join(f"{page_id} 0 R" for page_id in self.page_ids)
+        self.write_object(2, f"<< /Type /Pages /Kids [{kids}] /Count {len(self.page_ids)} >>".encode("ascii"))
+        self.write_object(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+
+        # Cross-reference table; every entry must be exactly 20 bytes
+        xref_offset = self.file.tell()
+        self.file.write(f"xref\n0 {self.next_id}\n".encode("ascii"))
+        self.file.write(b"0000000000 65535 f \n")
+        for obj_id in range(1, self.next_id):
+            self.file.write(f"{self.offsets[obj_id]:010d} 00000 n \n".encode("ascii"))
+        self.file.write(
+            f"trailer\n<< /Size {self.next_id} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode("ascii")
+        )
+        self.file.close()
+
+    def abort(self):
+        """Close and delete a partially written file"""
+        self.file.close()
+        try:
+            os.remove(self.filename)
+        except OSError:
+            pass
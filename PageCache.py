@@ -0,0 +1,165 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+import cv2
+import numpy as np
+
+# Bump when processing changes in a way the settings don't capture
+CACHE_VERSION = 1
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "camify", "pages")
+
+# Temporary files older than this were left by a writer that crashed
+STALE_TEMP_SECONDS = 600
+
+class PageCache:
+    """
+    On-disk cache of processed pages, keyed by content.
+
+    The key is a SHA-256 of the source pixels, the corners rounded to
+    corner_step pixels and the processing settings, so the same photo
+    with the same crop is only processed once. Pages are stored as
+    lossless PNG files; a hit refreshes the file's modification time and
+    the oldest files are evicted once the cache grows past max_bytes.
+
+    Several processes can share one directory: entries are written to a
+    temporary file and renamed into place, so readers never see a partial
+    page, and files that vanish to another process's eviction are simply
+    treated as misses. Temporary files left behind by a crashed writer are
+    removed by trim().
+    """
+
+    def __init__(self, directory=None, max_bytes=512 * 1024 * 1024, corner_step=2.0, compression=1, trim_interval=16):
+        self.directory = directory or DEFAULT_CACHE_DIR
+        os.makedirs(self.directory, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.corner_step = corner_step
+        self.compression = compression
+        # Check the cache size every trim_interval writes
+        self.trim_interval = trim_interval
+        self._writes_since_trim = trim_interval
+        # Lookups by this instance; other processes keep their own counts
+        self.hits = 0
+        self.misses = 0
+
+    def make_key(self, image, corners, settings):
+        digest = hashlib.sha256()
+        digest.update(f"{CACHE_VERSION}|{image.shape}|{image.dtype}|".encode())
+        digest.update(np.ascontiguousarray(image).data)
+        if corners is not None:
+            quantised = np.round(np.float32(corners).reshape(-1, 2) / self.corner_step).astype(np.int32)
+            digest.update(quantised.tobytes())
+        digest.update(json.dumps(settings, sort_keys=True, default=str).encode())
+        return digest.hexdigest()
+
+    def get_path(self, key):
+        # Two-level layout keeps directories small
+        return os.path.join(self.directory, key[:2], key + ".png")
+
+    def get(self, key):
+        """Return the cached page for key, or None"""
+        path = self.get_path(key)
+        page = cv2.imread(path, cv2.IMREAD_UNCHANGED) if os.path.exists(path) else None
+        if page is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        try:
+            # Mark as recently used
+            os.utime(path)
+        except OSError:
+            pass
+        return page
+
+    def put(self, key, page):
+        path = self.get_path(key)
+        try:
+            ok, data = cv2.imencode(".png", page, [cv2.IMWRITE_PNG_COMPRESSION, self.compression])
+            if not ok:
+                return False
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(suffix=".tmp", dir=os.path.dirname(path))
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data.tobytes())
+                os.replace(temp_path, path)
+            except BaseException:
+                os.remove(temp_path)
+                raise
+        except Exception as e:
+            print(f"Error writing page cache: {e}")
+            return False
+
+        self._writes_since_trim += 1
+        if self._writes_since_trim >= self.trim_interval:
+            self.trim()
+        return True
+
+    def list_entries(self, suffix=".png"):
+        """Return [(mtime, size, path)] for all cached pages, or other files by suffix"""
+        entries = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if not name.endswith(suffix):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def remove_stale_temp_files(self):
+        # Recent ones may still be being written by another process
+        cutoff = time.time() - STALE_TEMP_SECONDS
+        for mtime, _, path in self.list_entries(".tmp"):
+            if mtime < cutoff:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    def trim(self):
+        """Evict least recently used pages until the cache fits in max_bytes"""
+        self._writes_since_trim = 0
+        self.remove_stale_temp_files()
+        entries = self.list_entries()
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_bytes:
+            return
+        # Evict a little extra so the next few writes don't trigger another pass
+        target = self.max_bytes * 0.9
+        for _, size, path in sorted(entries):
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self):
+        for _, _, path in self.list_entries():
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def get_stats(self):
+        """
+        Size of the cache directory, as shared by every process using it,
+        and the hits and misses of this instance
+        """
+        entries = self.list_entries()
+        lookups = self.hits + self.misses
+        return {
+            "pages": len(entries),
+            "bytes": sum(size for _, size, _ in entries),
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,152 @@
+import os
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import cv2
+
+from CameraManager import CameraManager
+from DocumentProcessor import DocumentProcessor
+
+class PageJob:
+    """A submitted page: its future plus whatever the caller wants back"""
+
+    __slots__ = ("future", "context")
+
+    def __init__(self, future, context):
+        self.future = future
+        self.context = context
+
+class PageProcessingQueue:
+    """
+    Warps and enhances captured pages on a worker thread pool.
+
+    submit() returns immediately with a future, or None when max_in_flight
+    pages are already being processed, so callers can back off instead of
+    piling up work. poll() is meant to be called from the UI loop: it hands
+    back finished pages strictly in submission order, so a slow page holds
+    back the ones behind it rather than letting them overtake it.
+
+    OpenCV releases the GIL, so pages really are processed in parallel.
+    Each worker thread gets its own DocumentProcessor (the enhancement
+    engine reuses buffers and is not thread-safe) built from the settings
+    of the processor passed in.
+    """
+
+    def __init__(self, document_processor, max_workers=None, max_in_flight=4):
+        self.settings = document_processor.get_settings()
+        if max_workers is None:
+            # Leave cores for the capture and detection threads
+            max_workers = max(1, min(4, (os.cpu_count() or 2) // 2))
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="page")
+        self.max_in_flight = max_in_flight
+        self.local = threading.local()
+        # Bumped by update_settings so workers rebuild their processors
+        self.generation = 0
+        self.jobs = deque()
+
+        # Counters
+        self.submitted_pages = 0
+        self.completed_pages = 0
+        self.rejected_pages = 0
+
+    def get_processor(self):
+        processor = getattr(self.local, "processor", None)
+        if processor is None or self.local.generation != self.generation:
+            processor = self.local.processor = DocumentProcessor(**self.settings)
+            self.local.generation = self.generation
+        return processor
+
+    def update_settings(self, document_processor):
+        """Use the processor's current settings for pages submitted from now on"""
+        self.settings = document_processor.get_settings()
+        self.generation += 1
+
+    def get_detector(self):
+        detector = getattr(self.local, "detector", None)
+        if detector is None:
+            # Detection only, no camera
+            detector = self.local.detector = CameraManager(camera_index=None)
+        return detector
+
+    def in_flight(self):
+        return len(self.jobs)
+
+    def is_full(self):
+        return len(self.jobs) >= self.max_in_flight
+
+    def submit(self, image=None, corners=None, path=None, detect=False, still=None, context=None):
+        """
+        Queue one page. Either pass the image, or a path to load in the worker.
+        With detect=True the document is located in the worker as well;
+        otherwise corners (None for no document) are used as given.
+        still, a full-resolution frame or a future of one, replaces image
+        for the warp, with the corners scaled up to it.
+        Returns the future, or None if the queue is full.
+        """
+        if self.is_full():
+            self.rejected_pages += 1
+            return None
+        future = self.executor.submit(self.process, image, corners, path, detect, still)
+        self.jobs.append(PageJob(future, context))
+        self.submitted_pages += 1
+        return future
+
+    def process(self, image, corners, path, detect, still=None):
+        """Runs in a worker; returns (page, status)"""
+        if path is not None:
+            image = cv2.imread(path)
+            if image is None:
+                return None, "unreadable"
+
+        if isinstance(still, Future):
+            try:
+                still = still.result(timeout=10.0)
+            except Exception as e:
+                print(f"Error capturing still: {e}")
+                still = None
+        if still is not None:
+            if corners is not None:
+                corners = self.get_detector().scale_corners_to_still(corners, image.shape, still)
+            image = still
+
+        if detect:
+            # Imported images can be very large, so detect on a downscaled copy
+            corners = self.get_detector().find_document(image, search_all=True)
+
+        if corners is None:
+            return image, "no_document"
+
+        # Only pages loaded from files can repeat; camera captures skip the cache
+        warped = self.get_processor().process_document(image, corners, use_cache=path is not None)
+        if warped is None:
+            # Warping failed, fall back to the unprocessed image
+            return image, "failed"
+        return warped, "processed"
+
+    def poll(self):
+        """Return [(page, status, context)] for finished pages, in submission order"""
+        results = []
+        while self.jobs and self.jobs[0].future.done():
+            job = self.jobs.popleft()
+            try:
+                page, status = job.future.result()
+            except Exception as e:
+                print(f"Error processing page: {e}")
+                page, status = None, "error"
+            self.completed_pages += 1
+            results.append((page, status, job.context))
+        return results
+
+    def get_stats(self):
+        return {
+            "in_flight": len(self.jobs),
+            "submitted_pages": self.submitted_pages,
+            "completed_pages": self.completed_pages,
+            "rejected_pages": self.rejected_pages,
+        }
+
+    def shutdown(self, wait=False):
+        # Pages not started yet are dropped; running ones finish in the background
+        self.executor.shutdown(wait=wait, cancel_futures=True)
+        self.jobs.clear()
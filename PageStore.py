@@ -0,0 +1,130 @@
+import os
+import shutil
+import tempfile
+import threading
+import weakref
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from PDFWriter import encode_image
+
+def _cleanup(executor, directory):
+    # Let running encodes finish before their directory disappears
+    executor.shutdown(wait=True, cancel_futures=True)
+    shutil.rmtree(directory, True)
+
+class PageStore:
+    """
+    List-like store of captured pages that spills every page to disk.
+
+    Pages are encoded into their final PDF image stream (JPEG, or Flate
+    when lossless output is wanted) on a thread pool as soon as they are
+    added, and the stream is spooled to disk. Export then only has to copy
+    the streams into the PDF.
+    append() returns straight away, so the caller must not modify the
+    image afterwards. At most max_pending raw pages wait for the encoders;
+    beyond that append() blocks until one is done, so callers that must
+    not block check pending() first.
+    """
+
+    def __init__(self, directory=None, encoding="jpeg", jpeg_quality=75, max_workers=None, max_pending=None):
+        self.directory = tempfile.mkdtemp(prefix="camify-pages-", dir=directory)
+        self.encoding = encoding
+        self.jpeg_quality = jpeg_quality
+        # OpenCV and zlib release the GIL, but pages arrive one at a time;
+        # half the cores (at most four) keep up without a thread per core
+        # for every store
+        if max_workers is None:
+            max_workers = max(1, min(4, (os.cpu_count() or 2) // 2))
+        if max_pending is None:
+            max_pending = 2 * max_workers
+        self.max_pending = max_pending
+        # Every queued page holds a full resolution image, so bound them
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="encode")
+        self.pages = []
+        self._counter = 0
+        # Remove the spool directory even if close() is never called
+        self._finalizer = weakref.finalize(self, _cleanup, self.executor, self.directory)
+
+    def __len__(self):
+        return len(self.pages)
+
+    def append(self, image):
+        """Queue a page for encoding"""
+        self._slots.acquire()
+        self._counter += 1
+        path = os.path.join(self.directory, f"page_{self._counter:06d}.bin")
+        future = self.executor.submit(self.encode, image, path)
+        # Also runs when the page is cancelled
+        future.add_done_callback(lambda _: self._slots.release())
+        self.pages.append({
+            "path": path,
+            "future": future,
+        })
+
+    def append_encoded(self, data, info):
+        """Add a page that was already encoded with encode_image"""
+        self._counter += 1
+        path = os.path.join(self.directory, f"page_{self._counter:06d}.bin")
+        with open(path, "wb") as f:
+            f.write(data)
+        future = Future()
+        future.set_result(info)
+        self.pages.append({
+            "path": path,
+            "future": future,
+        })
+
+    def encode(self, image, path):
+        """Runs on the encoder pool; returns the stream info"""
+        data, info = encode_image(image, self.encoding, self.jpeg_quality)
+        with open(path, "wb") as f:
+            f.write(data)
+        return info
+
+    def snapshot(self):
+        """The current pages, for reading while others are being added"""
+        return list(self.pages)
+
+    def read_encoded(self, page):
+        """Return (data, info) for a page, waiting for its encoding if needed"""
+        info = page["future"].result()
+        with open(page["path"], "rb") as f:
+            return f.read(), info
+
+    def pending(self):
+        """Number of pages still waiting to be encoded"""
+        return sum(not page["future"].done() for page in self.pages)
+
+    def pop(self):
+        page = self.pages.pop()
+        self.remove_file(page)
+        return page
+
+    def remove(self, pages):
+        """Drop the given pages, e.g. the ones just exported"""
+        ids = {id(page) for page in pages}
+        for page in pages:
+            self.remove_file(page)
+        self.pages = [page for page in self.pages if id(page) not in ids]
+
+    def clear(self):
+        for page in self.pages:
+            self.remove_file(page)
+        self.pages.clear()
+
+    def remove_file(self, page):
+        # A page still queued is cancelled; one being encoded is waited for
+        if not page["future"].cancel():
+            try:
+                page["future"].result()
+            except Exception:
+                pass
+        try:
+            os.remove(page["path"])
+        except OSError:
+            pass
+
+    def close(self):
+        self.pages.clear()
+        self._finalizer()
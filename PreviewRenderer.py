@@ -0,0 +1,112 @@
+import cv2
+import numpy as np
+import PIL.Image, PIL.ImageTk
+
+from Profiler import profiler
+
+class PreviewRenderer:
+    """
+    Draws images into a Tk canvas without per-frame allocations.
+
+    The canvas keeps a single image item backed by a single PhotoImage.
+    Frames are resized and converted into preallocated buffers, and the
+    PhotoImage pixels are updated in place. Scale, offsets and buffers are
+    only recomputed when the canvas or the frame size changes.
+    """
+
+    def __init__(self, canvas, fallback_size=None):
+        self.canvas = canvas
+        # Size to assume before the canvas has been laid out
+        self.fallback_size = fallback_size
+        self.canvas_size = (canvas.winfo_width(), canvas.winfo_height())
+        canvas.bind("<Configure>", self.on_configure, add="+")
+
+        self.layout_key = None
+        self.size = None
+        self.offset = (0, 0)
+        self.scale = 1.0
+
+        self.resized = None
+        self.rgba = None
+        self.pil_image = None
+        self.photo = None
+        self.image_item = None
+        self.hidden = False
+
+    def on_configure(self, event):
+        self.canvas_size = (event.width, event.height)
+
+    def get_canvas_size(self):
+        width, height = self.canvas_size
+        if (width <= 1 or height <= 1) and self.fallback_size:
+            return self.fallback_size
+        return width, height
+
+    def update_layout(self, canvas_width, canvas_height, src_width, src_height, channels):
+        """Recompute the fit and (re)allocate the buffers for a new size"""
+        self.scale = min(canvas_width / src_width, canvas_height / src_height)
+        width = max(1, int(src_width * self.scale))
+        height = max(1, int(src_height * self.scale))
+        self.offset = ((canvas_width - width) // 2, (canvas_height - height) // 2)
+
+        if self.size != (width, height) or self.resized is None or self.resized.ndim != (3 if channels == 3 else 2):
+            self.size = (width, height)
+            shape = (height, width, 3) if channels == 3 else (height, width)
+            self.resized = np.empty(shape, dtype=np.uint8)
+            # Pillow only maps 4-byte pixels without copying, so convert to RGBA;
+            # the PIL image then shares memory with the buffer
+            self.rgba = np.empty((height, width, 4), dtype=np.uint8)
+            self.pil_image = PIL.Image.frombuffer("RGBA", (width, height), self.rgba, "raw", "RGBA", 0, 1)
+            self.photo = PIL.ImageTk.PhotoImage(image=self.pil_image)
+            if self.image_item is None:
+                self.image_item = self.canvas.create_image(0, 0, image=self.photo, anchor="nw")
+            else:
+                self.canvas.itemconfigure(self.image_item, image=self.photo)
+
+        self.canvas.coords(self.image_item, *self.offset)
+
+    def clear(self):
+        """Blank the canvas until the next render"""
+        if self.image_item is not None and not self.hidden:
+            self.canvas.itemconfigure(self.image_item, state="hidden")
+            self.hidden = True
+
+    def render(self, frame, overlay=None):
+        """
+        Draw a BGR or grayscale frame centred in the canvas.
+
+        overlay, if given, is called with the resized BGR (or gray) buffer
+        and the scale factor before colour conversion, to draw annotations
+        at display resolution.
+        """
+        canvas_width, canvas_height = self.get_canvas_size()
+        # Skip first few frames until canvas is properly sized
+        if canvas_width <= 1 or canvas_height <= 1:
+            return False
+
+        src_height, src_width = frame.shape[:2]
+        channels = 1 if frame.ndim == 2 else frame.shape[2]
+        key = (canvas_width, canvas_height, src_width, src_height, channels)
+        if key != self.layout_key:
+            self.update_layout(canvas_width, canvas_height, src_width, src_height, channels)
+            self.layout_key = key
+
+        with profiler.stage("ui.resize"):
+            cv2.resize(frame, self.size, dst=self.resized)
+
+        if overlay is not None:
+            overlay(self.resized, self.scale)
+
+        # Convert to RGBA for tkinter
+        with profiler.stage("ui.cvtColor"):
+            if self.resized.ndim == 2:
+                cv2.cvtColor(self.resized, cv2.COLOR_GRAY2RGBA, dst=self.rgba)
+            else:
+                cv2.cvtColor(self.resized, cv2.COLOR_BGR2RGBA, dst=self.rgba)
+
+        with profiler.stage("ui.PhotoImage"):
+            self.photo.paste(self.pil_image)
+        if self.hidden:
+            self.canvas.itemconfigure(self.image_item, state="normal")
+            self.hidden = False
+        return True
@@ -0,0 +1,144 @@
+import csv
+import json
+import os
+import threading
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+class NullStage:
+    """Context manager that does nothing; handed out while profiling is off"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+NULL_STAGE = NullStage()
+
+class Stage:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.profiler.record(self.name, time.perf_counter() - self.start)
+        return False
+
+class Profiler:
+    """
+    Records per-stage timings with rolling percentiles.
+
+    Wrap a stage in ``with profiler.stage("name"):``. While disabled, stage()
+    returns a shared no-op context manager, so instrumented code pays only for
+    one method call. Each stage keeps the last ``window`` samples for
+    p50/p95/p99 plus running totals.
+    """
+
+    def __init__(self, window=300, enabled=False):
+        self.window = window
+        self.enabled = enabled
+        self.samples = {}
+        self.counts = {}
+        self.totals = {}
+        self.lock = threading.Lock()
+
+    def stage(self, name):
+        if not self.enabled:
+            return NULL_STAGE
+        return Stage(self, name)
+
+    def record(self, name, seconds):
+        # Timings taken outside stage() are dropped too while profiling is off
+        if not self.enabled:
+            return
+        samples = self.samples.get(name)
+        if samples is None:
+            with self.lock:
+                samples = self.samples.setdefault(name, deque(maxlen=self.window))
+                self.counts.setdefault(name, 0)
+                self.totals.setdefault(name, 0.0)
+        samples.append(seconds)
+        self.counts[name] += 1
+        self.totals[name] += seconds
+
+    def reset(self):
+        with self.lock:
+            self.samples.clear()
+            self.counts.clear()
+            self.totals.clear()
+
+    def get_stats(self):
+        """Return {stage: {count, mean_ms, p50_ms, p95_ms, p99_ms, total_ms}}"""
+        stats = {}
+        with self.lock:
+            names = list(self.samples)
+        for name in names:
+            window = np.array(self.samples[name], dtype=np.float64) * 1000.0
+            if not len(window):
+                continue
+            p50, p95, p99 = np.percentile(window, [50, 95, 99])
+            stats[name] = {
+                "count": self.counts[name],
+                "mean_ms": float(window.mean()),
+                "p50_ms": float(p50),
+                "p95_ms": float(p95),
+                "p99_ms": float(p99),
+                "total_ms": self.totals[name] * 1000.0,
+            }
+        return stats
+
+    def draw_overlay(self, frame, prefixes=None):
+        """Draw a stats table onto a BGR frame in place"""
+        stats = self.get_stats()
+        lines = ["stage                 p50    p95    p99 ms"]
+        for name in sorted(stats):
+            if prefixes and not name.startswith(tuple(prefixes)):
+                continue
+            s = stats[name]
+            lines.append(f"{name[:20]:20s} {s['p50_ms']:6.2f} {s['p95_ms']:6.2f} {s['p99_ms']:6.2f}")
+
+        font = cv2.FONT_HERSHEY_PLAIN
+        line_height = 14
+        width = min(frame.shape[1], 330)
+        height = min(frame.shape[0], line_height * len(lines) + 6)
+        # Darken the area behind the text so it stays readable
+        region = frame[:height, :width]
+        region //= 3
+        for i, line in enumerate(lines):
+            y = line_height * (i + 1)
+            if y > height:
+                break
+            cv2.putText(frame, line, (4, y), font, 0.9, (255, 255, 255), 1, cv2.LINE_AA)
+        return frame
+
+    def dump_json(self, path):
+        with open(path, "w") as f:
+            json.dump({"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "stages": self.get_stats()}, f, indent=2)
+
+    def dump_csv(self, path):
+        fields = ["stage", "count", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "total_ms"]
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            for name, s in sorted(self.get_stats().items()):
+                writer.writerow(dict(stage=name, **s))
+
+    def dump(self, path):
+        """Write JSON or CSV depending on the file extension"""
+        if path.lower().endswith(".csv"):
+            self.dump_csv(path)
+        else:
+            self.dump_json(path)
+
+# Shared profiler used by all modules; set CAMIFY_PROFILE=1 to start enabled
+profiler = Profiler(enabled=os.environ.get("CAMIFY_PROFILE") == "1")
@@ -0,0 +1,83 @@
+import cv2
+import numpy as np
+
+from DocumentProcessor import DocumentProcessor
+from Profiler import profiler
+
+class RectifiedPreview:
+    """
+    Flattens the detected page of each live frame at preview resolution.
+
+    The perspective transform is turned into fixed-point remap tables once
+    and reused for every frame while the corners stay within tolerance
+    pixels of the ones the tables were built for, so a steady page costs a
+    single cv2.remap per frame. The page is scaled to fit max_size.
+    """
+
+    def __init__(self, max_size=(480, 640), tolerance=1.5):
+        self.max_size = max_size
+        self.tolerance = tolerance
+
+        self.corners = None
+        self.frame_shape = None
+        self.map1 = None
+        self.map2 = None
+        self.output = None
+
+        # Counters
+        self.rebuilds = 0
+        self.reuses = 0
+
+    def needs_rebuild(self, frame, rect):
+        if self.corners is None or frame.shape != self.frame_shape:
+            return True
+        return float(np.abs(rect - self.corners).max()) > self.tolerance
+
+    def build_maps(self, frame, rect):
+        """Precompute where each output pixel samples the frame"""
+        tl, bl, br, tr = rect
+        quad_width = max(np.linalg.norm(br - bl), np.linalg.norm(tr - tl))
+        quad_height = max(np.linalg.norm(bl - tl), np.linalg.norm(br - tr))
+        scale = min(self.max_size[0] / max(quad_width, 1.0), self.max_size[1] / max(quad_height, 1.0))
+        width = max(1, int(round(quad_width * scale)))
+        height = max(1, int(round(quad_height * scale)))
+
+        output_pts = np.float32([[0, 0], [0, height], [width, height], [width, 0]])
+        # Output to frame, the direction remap looks up
+        M = cv2.getPerspectiveTransform(output_pts, rect)
+
+        xs, ys = np.meshgrid(np.arange(width, dtype=np.float32), np.arange(height, dtype=np.float32))
+        denominator = M[2, 0] * xs + M[2, 1] * ys + M[2, 2]
+        map_x = ((M[0, 0] * xs + M[0, 1] * ys + M[0, 2]) / denominator).astype(np.float32)
+        map_y = ((M[1, 0] * xs + M[1, 1] * ys + M[1, 2]) / denominator).astype(np.float32)
+        # Fixed-point maps remap noticeably faster than float ones
+        self.map1, self.map2 = cv2.convertMaps(map_x, map_y, cv2.CV_16SC2)
+
+        self.output = np.empty((height, width) + frame.shape[2:], dtype=frame.dtype)
+        self.corners = rect
+        self.frame_shape = frame.shape
+        self.rebuilds += 1
+
+    def render(self, frame, corners):
+        """Return the flattened page, or None without corners. The buffer is reused"""
+        if corners is None:
+            return None
+        rect = DocumentProcessor.order_corners(corners)
+
+        if self.needs_rebuild(frame, rect):
+            with profiler.stage("rectify.build_maps"):
+                self.build_maps(frame, rect)
+        else:
+            self.reuses += 1
+
+        with profiler.stage("rectify.remap"):
+            cv2.remap(frame, self.map1, self.map2, cv2.INTER_LINEAR, dst=self.output)
+        return self.output
+
+    def get_stats(self):
+        total = self.rebuilds + self.reuses
+        return {
+            "rebuilds": self.rebuilds,
+            "reuses": self.reuses,
+            "reuse_ratio": self.reuses / total if total else 0.0,
+        }
@@ -0,0 +1,421 @@
+"""
+Synthetic-document benchmark and accuracy suite.
+
+Generates frames with known page corners at several resolutions and
+measures detection speed and accuracy, process_document latency and
+PDF export throughput. Needs no camera; results are written as JSON.
+
+    python ScanBenchmark.py -o results.json
+    python ScanBenchmark.py --resolutions 640x480,4000x3000 --frames 20
+    python ScanBenchmark.py --compare baseline.json results.json
+    python ScanBenchmark.py --replay images:session/ --fps 30 --seconds 20
+    python ScanBenchmark.py --replay camera:0 --replay camera:1 --seconds 20
+    python ScanBenchmark.py --tiling 6000x8000
+    python ScanBenchmark.py --presets 2480x3508
+"""
+import argparse
+import json
+import os
+import platform
+import tempfile
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from CameraManager import CameraManager
+from CameraStation import CameraStation
+from CapturePipeline import CapturePipeline
+from DocumentProcessor import DocumentProcessor
+from EnhancementEngine import EnhancementEngine, PRESETS
+from FrameSource import create_source
+from PDFManager import PDFManager
+from SyntheticDocument import SyntheticDocumentGenerator
+
+DEFAULT_RESOLUTIONS = "640x480,1280x720,1920x1080,4000x3000"
+
+# Replay sources that never run out, so --seconds 0 cannot apply to them
+ENDLESS_SOURCES = ("camera", "synthetic")
+
+# Metrics compared by --compare, and whether higher is better
+COMPARED_METRICS = {
+    "detection_fps": True,
+    "detection_rate": True,
+    "corner_error_px": False,
+    "process_ms_p50": False,
+    "pdf_pages_per_second": True,
+    "alloc_bytes_per_frame": False,
+}
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) if len(values) else None
+
+
+def corner_error(detected, truth):
+    """Mean distance between matching corners, both in any order"""
+    ordered = DocumentProcessor.order_corners(detected)
+    expected = DocumentProcessor.order_corners(truth)
+    return float(np.linalg.norm(ordered - expected, axis=1).mean())
+
+
+def measure_allocations(camera_manager, frames, repeat=3):
+    """
+    Peak bytes allocated while detecting on each frame, as in the live
+    pipeline (no annotation). numpy and OpenCV arrays are both visible to
+    tracemalloc. Each frame is run a few times so warm buffers are measured.
+    """
+    peaks = []
+    tracemalloc.start()
+    try:
+        for frame in frames:
+            for _ in range(repeat):
+                tracemalloc.reset_peak()
+                base = tracemalloc.get_traced_memory()[0]
+                camera_manager.process_frame(frame, annotate=False)
+                peaks.append(tracemalloc.get_traced_memory()[1] - base)
+    finally:
+        tracemalloc.stop()
+    return float(np.mean(peaks))
+
+
+def bench_resolution(width, height, frames, seed, preset, pdf_pages):
+    generator = SyntheticDocumentGenerator(seed)
+    camera_manager = CameraManager(camera_index=None)
+    processor = DocumentProcessor(preset=preset)
+
+    samples = []
+    for i in range(frames):
+        # Mix of conditions: every third page is coloured, strength of the
+        # degradations varies from frame to frame
+        frame, corners = generator.generate(
+            width, height,
+            perspective=generator.rng.uniform(0.0, 0.12),
+            noise=generator.rng.uniform(0.0, 8.0),
+            blur=generator.rng.uniform(0.0, 1.5),
+            lighting=generator.rng.uniform(0.0, 0.4),
+            color=(i % 3 == 0),
+        )
+        samples.append((frame, corners))
+
+    # Detection, as run on live frames
+    detect_times = []
+    errors = []
+    detected = 0
+    for frame, corners in samples:
+        work = frame.copy()
+        start = time.perf_counter()
+        camera_manager.process_frame(work)
+        detect_times.append(time.perf_counter() - start)
+        if camera_manager.is_document_detected:
+            detected += 1
+            errors.append(corner_error(camera_manager.document_corners, corners))
+
+    # Transient allocations per detected frame, measured separately since
+    # tracing slows everything down
+    alloc_bytes = measure_allocations(camera_manager, [frame for frame, _ in samples])
+
+    # Warp and enhancement with the true corners
+    process_times = []
+    pages = []
+    for frame, corners in samples:
+        start = time.perf_counter()
+        page = processor.process_document(frame, corners)
+        process_times.append(time.perf_counter() - start)
+        if page is not None and len(pages) < pdf_pages:
+            pages.append(page)
+
+    # PDF export throughput, if any page could be processed
+    pdf_seconds = None
+    pdf_bytes = None
+    if pages:
+        pdf_manager = PDFManager()
+        fd, filename = tempfile.mkstemp(suffix=".pdf")
+        os.close(fd)
+        try:
+            # Pages are encoded as they are added, so time adding and writing
+            # together as one export
+            start = time.perf_counter()
+            for i in range(pdf_pages):
+                pdf_manager.add_image(pages[i % len(pages)])
+            pdf_manager.create_pdf(filename)
+            pdf_seconds = time.perf_counter() - start
+            pdf_bytes = os.path.getsize(filename)
+        finally:
+            os.remove(filename)
+
+    detect_total = sum(detect_times)
+    return {
+        "resolution": f"{width}x{height}",
+        "frames": frames,
+        "detection_fps": frames / detect_total if detect_total > 0 else None,
+        "detection_ms_p50": percentile(detect_times, 50) * 1000,
+        "detection_ms_p95": percentile(detect_times, 95) * 1000,
+        "detection_rate": detected / frames,
+        "alloc_bytes_per_frame": alloc_bytes,
+        # The same in full frames, to compare across resolutions
+        "alloc_frames_per_frame": alloc_bytes / samples[0][0].nbytes,
+        "corner_error_px": float(np.mean(errors)) if errors else None,
+        "corner_error_px_p95": percentile(errors, 95),
+        "corner_error_rel": float(np.mean(errors)) / np.hypot(width, height) if errors else None,
+        "process_ms_p50": percentile(process_times, 50) * 1000,
+        "process_ms_p95": percentile(process_times, 95) * 1000,
+        "pdf_pages": pdf_pages,
+        "pdf_seconds": pdf_seconds,
+        "pdf_pages_per_second": pdf_pages / pdf_seconds if pdf_seconds else None,
+        "pdf_bytes": pdf_bytes,
+    }
+
+
+def bench_tiling(width, height, seed, preset, repeat=3):
+    """
+    Enhancement latency of one large page with 1, 2, 4, ... tile threads up
+    to the core count, the speedup over whole-page enhancement and the
+    largest pixel difference from the whole-page result.
+    """
+    page = SyntheticDocumentGenerator(seed).generate(width, height, perspective=0.0, color=True)[0]
+    counts = [1]
+    while counts[-1] * 2 <= (os.cpu_count() or 1):
+        counts.append(counts[-1] * 2)
+    if counts[-1] != (os.cpu_count() or 1):
+        counts.append(os.cpu_count())
+
+    reference = None
+    baseline_ms = None
+    results = []
+    for threads in counts:
+        engine = EnhancementEngine(preset, tile_threads=threads, min_tile_pixels=0)
+        engine.enhance(page)  # warm up buffers and threads
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = engine.enhance(page)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        if reference is None:
+            reference = result
+            baseline_ms = best * 1000.0
+        results.append({
+            "tile_threads": threads,
+            "enhance_ms": best * 1000.0,
+            "speedup": baseline_ms / (best * 1000.0),
+            "max_abs_diff": int(cv2.absdiff(result, reference).max()),
+        })
+    return {"resolution": f"{width}x{height}", "preset": preset, "results": results}
+
+
+def bench_presets(width, height, seed, repeat=3):
+    """
+    Latency of every enhancement preset on one page against its budget,
+    and how far its output is from the balanced preset's.
+    """
+    page = SyntheticDocumentGenerator(seed).generate(width, height, perspective=0.0, color=True)[0]
+    results = [EnhancementEngine(preset).evaluate(page, repeat) for preset in PRESETS]
+    return {"resolution": f"{width}x{height}", "results": results}
+
+
+def run_benchmark(resolutions, frames, seed, preset, pdf_pages):
+    results = []
+    for width, height in resolutions:
+        results.append(bench_resolution(width, height, frames, seed, preset, pdf_pages))
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "opencv": cv2.__version__,
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "seed": seed,
+            "frames": frames,
+            "preset": preset,
+        },
+        "results": results,
+    }
+
+
+def run_replay(spec, seconds, fps, display_rate=60.0):
+    """
+    Push a frame source through the threaded capture and detection pipeline,
+    polling results at display_rate like the UI does. Runs for the given
+    number of seconds, or until a finite source is exhausted when seconds
+    is 0. Reports sustained throughput and dropped frames.
+    """
+    if not seconds and spec.partition(":")[0] in ENDLESS_SOURCES:
+        raise ValueError(f"{spec} never ends; give a duration in seconds")
+    source = create_source(spec, fps=fps, loop=bool(seconds))
+    camera_manager = CameraManager(source=source)
+    pipeline = CapturePipeline(camera_manager)
+
+    displayed = 0
+    start = time.perf_counter()
+    pipeline.start()
+    try:
+        while True:
+            time.sleep(1.0 / display_rate)
+            result = pipeline.get_result()
+            if result is not None:
+                displayed += 1
+                pipeline.release_result(result)
+            elapsed = time.perf_counter() - start
+            if seconds and elapsed >= seconds:
+                break
+            # A finite source is done once every captured frame was handled
+            handled = pipeline.frames_detected + pipeline.dropped_frames
+            if source.exhausted and handled >= pipeline.frames_captured:
+                break
+    finally:
+        pipeline.stop()
+        camera_manager.release()
+
+    elapsed = time.perf_counter() - start
+    stats = pipeline.get_stats()
+    captured = stats["frames_captured"]
+    return {
+        "source": spec,
+        "target_fps": fps,
+        "seconds": elapsed,
+        "frames_captured": captured,
+        "frames_detected": stats["frames_detected"],
+        "frames_displayed": displayed,
+        "dropped_frames": stats["dropped_frames"],
+        "drop_rate": stats["dropped_frames"] / captured if captured else 0.0,
+        # Detection results replaced before the display loop picked them up
+        "display_dropped": stats["frames_detected"] - displayed,
+        "capture_fps": captured / elapsed,
+        "detect_fps": stats["frames_detected"] / elapsed,
+        "display_fps": displayed / elapsed,
+    }
+
+
+def run_station_replay(specs, seconds, fps, display_rate=60.0):
+    """
+    Run several frame sources at once as a multi-camera station, polling
+    every camera at display_rate like the UI does. Reports throughput and
+    CPU use per camera; cpu_share is each camera's part of the CPU time
+    used by all of them.
+    """
+    station = CameraStation(specs, fps=fps)
+    displayed = [0] * len(station.cameras)
+    start = time.perf_counter()
+    station.start()
+    try:
+        while time.perf_counter() - start < seconds:
+            time.sleep(1.0 / display_rate)
+            for camera in station.cameras:
+                result = camera.capture_pipeline.get_result()
+                if result is not None:
+                    displayed[camera.index] += 1
+                    camera.capture_pipeline.release_result(result)
+        stats = station.get_stats()
+    finally:
+        station.release()
+
+    elapsed = time.perf_counter() - start
+    cameras = []
+    for spec, camera_stats, shown in zip(specs, stats, displayed):
+        cameras.append({
+            "source": spec,
+            "frames_captured": camera_stats["frames_captured"],
+            "frames_detected": camera_stats["frames_detected"],
+            "frames_displayed": shown,
+            "dropped_frames": camera_stats["dropped_frames"],
+            "capture_fps": camera_stats["frames_captured"] / elapsed,
+            "detect_fps": camera_stats["frames_detected"] / elapsed,
+            "cpu_cores": camera_stats["cpu_cores"],
+            "cpu_share": camera_stats["cpu_share"],
+            "cpu_seconds": camera_stats["cpu_seconds"],
+        })
+    return {
+        "target_fps": fps,
+        "seconds": elapsed,
+        "detect_fps_total": sum(camera["detect_fps"] for camera in cameras),
+        "cameras": cameras,
+    }
+
+
+def compare(baseline, current):
+    """Print the relative change of the key metrics between two result files"""
+    before = {row["resolution"]: row for row in baseline["results"]}
+    for row in current["results"]:
+        old = before.get(row["resolution"])
+        if old is None:
+            continue
+        print(row["resolution"])
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            a, b = old.get(metric), row.get(metric)
+            if a is None or b is None:
+                continue
+            change = (b - a) / a * 100 if a else 0.0
+            better = (change >= 0) == higher_is_better
+            print(f"  {metric:22s} {a:10.3f} -> {b:10.3f}  ({change:+6.1f}%{'' if better or not change else ' worse'})")
+
+
+def parse_resolutions(text):
+    resolutions = []
+    for item in text.split(","):
+        width, height = item.lower().split("x")
+        resolutions.append((int(width), int(height)))
+    return resolutions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark detection, processing and PDF export on synthetic documents.")
+    parser.add_argument("--resolutions", default=DEFAULT_RESOLUTIONS, help="comma separated WIDTHxHEIGHT list")
+    parser.add_argument("--frames", type=int, default=30, help="frames per resolution")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="balanced", help="enhancement preset")
+    parser.add_argument("--pdf-pages", type=int, default=20, help="pages in the PDF export test")
+    parser.add_argument("-o", "--output", help="write JSON results to this file instead of stdout")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"), help="compare two result files")
+    parser.add_argument("--replay", metavar="SOURCE", action="append",
+                        help="measure the live pipeline on a frame source: camera:N, video:PATH, images:DIR, synthetic:WxH; "
+                             "repeat to run several cameras at once")
+    parser.add_argument("--fps", type=float, default=None, help="source frame rate for --replay (default: as fast as possible)")
+    parser.add_argument("--seconds", type=float, default=10.0, help="--replay duration; 0 runs a file or directory once")
+    parser.add_argument("--tiling", metavar="WxH", help="measure tiled enhancement of a page of this size against thread count")
+    parser.add_argument("--presets", metavar="WxH", help="check every enhancement preset against its latency budget on a page of this size; "
+                                                         "exits with 1 when one is over budget")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            baseline = json.load(f)
+        with open(args.compare[1]) as f:
+            current = json.load(f)
+        compare(baseline, current)
+        return 0
+
+    status = 0
+    if args.presets:
+        width, height = parse_resolutions(args.presets)[0]
+        report = {"meta": {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "cpu_count": os.cpu_count()},
+                  "presets": bench_presets(width, height, args.seed)}
+        if not all(result["within_budget"] for result in report["presets"]["results"]):
+            status = 1
+    elif args.tiling:
+        width, height = parse_resolutions(args.tiling)[0]
+        report = {"meta": {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "cpu_count": os.cpu_count()},
+                  "tiling": bench_tiling(width, height, args.seed, args.preset)}
+    elif args.replay:
+        report = {"meta": {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "cpu_count": os.cpu_count()}}
+        if not args.seconds and args.replay[0].partition(":")[0] in ENDLESS_SOURCES:
+            parser.error("--seconds 0 only works for video: and images: sources")
+        if len(args.replay) > 1:
+            report["station"] = run_station_replay(args.replay, args.seconds or 10.0, args.fps)
+        else:
+            report["replay"] = run_replay(args.replay[0], args.seconds, args.fps)
+    else:
+        report = run_benchmark(parse_resolutions(args.resolutions), args.frames, args.seed, args.preset, args.pdf_pages)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return status
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
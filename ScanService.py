@@ -0,0 +1,369 @@
+"""
+Local document scanning service.
+
+Accepts images over HTTP, runs detection, perspective warp and enhancement
+in a bounded process pool and returns processed pages or a finished PDF.
+Uses only asyncio from the standard library; binds to localhost by default.
+
+    python ScanService.py --port 8765 -j 4
+
+    POST   /scan                    image in, processed page out (?format=png|jpeg)
+    POST   /sessions                start a multi-page document, returns {"id": ...}
+    POST   /sessions/ID/pages       add an image to the document
+    GET    /sessions/ID/pdf         the document as PDF
+    DELETE /sessions/ID             discard the document
+    GET    /metrics                 queue depth and latency percentiles (JSON)
+
+When every worker is busy and the queue is full, requests get 429 with a
+Retry-After header instead of piling up. Sessions not used for
+session_ttl seconds are discarded.
+"""
+import argparse
+import asyncio
+import json
+import math
+import multiprocessing
+import os
+import tempfile
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+import cv2
+import numpy as np
+
+from BatchScanner import init_worker, scan_array
+from EnhancementEngine import PRESETS
+from PDFManager import PDFManager
+from PDFWriter import encode_image
+
+STATUS_TEXT = {
+    200: "OK",
+    201: "Created",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    422: "Unprocessable Entity",
+    429: "Too Many Requests",
+    500: "Internal Server Error",
+}
+
+
+def process_upload(data, output):
+    """
+    Runs in a worker process. Decodes an uploaded image and scans it.
+    With output "pdf" the page comes back as a PDF image stream (data, info)
+    ready for PDFManager.add_encoded_image; otherwise as PNG or JPEG bytes.
+    Returns (result, detected), or (None, False) for undecodable uploads.
+    """
+    image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        return None, False
+    page, detected = scan_array(image)
+    if output == "pdf":
+        return encode_image(page), detected
+    ok, encoded = cv2.imencode("." + output, page)
+    if not ok:
+        # Not the client's fault; answered with 500
+        raise RuntimeError(f"Could not encode page as {output}")
+    return encoded.tobytes(), detected
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+class Session:
+    """A multi-page document being built through /sessions"""
+
+    def __init__(self):
+        # Pages arrive already encoded, so one encoder thread is plenty
+        self.pdf_manager = PDFManager(encode_workers=1)
+        # Pages of a session are added one at a time, off the event loop
+        self.lock = asyncio.Lock()
+        self.last_used = time.monotonic()
+
+    def touch(self):
+        self.last_used = time.monotonic()
+
+
+class ScanService:
+
+    def __init__(self, jobs=None, max_queue=None, preset="balanced", cache_dir=None, bilevel=False,
+                 max_body=64 * 1024 * 1024, session_ttl=1800):
+        self.jobs = jobs or os.cpu_count() or 1
+        # Requests allowed in the pool at once, running or waiting
+        self.max_queue = max_queue or self.jobs * 2
+        self.max_body = max_body
+        # Idle seconds before an abandoned session is discarded
+        self.session_ttl = session_ttl
+        # Workers start on demand, by then the event loop has threads of
+        # its own; spawn keeps them out of the children
+        self.executor = ProcessPoolExecutor(max_workers=self.jobs, mp_context=multiprocessing.get_context("spawn"),
+                                            initializer=init_worker, initargs=(preset, cache_dir, bilevel))
+        self.sessions = {}
+
+        # Metrics
+        self.in_flight = 0
+        self.requests = 0
+        self.rejected = 0
+        self.errors = 0
+        self.expired_sessions = 0
+        self.latencies = {}
+        self.started = time.time()
+
+    # Worker pool
+
+    async def run_job(self, data, output):
+        if self.in_flight >= self.max_queue:
+            self.rejected += 1
+            raise HTTPError(429, "Scanner busy", {"Retry-After": str(self.get_retry_after())})
+        self.in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, process_upload, data, output)
+        finally:
+            self.in_flight -= 1
+
+    def get_retry_after(self):
+        """Seconds until a slot should free up, from the recent scan latency"""
+        samples = self.latencies.get("POST /scan") or self.latencies.get("POST /sessions/pages")
+        typical = float(np.median(samples)) if samples else 1.0
+        return max(1, math.ceil(typical * self.in_flight / self.jobs))
+
+    # Handlers
+
+    async def handle_scan(self, query, body):
+        output = query.get("format", ["png"])[0].lower()
+        if output not in ("png", "jpeg", "jpg"):
+            raise HTTPError(400, "format must be png or jpeg")
+        output = "jpg" if output == "jpeg" else output
+        page, detected = await self.run_job(body, output)
+        if page is None:
+            raise HTTPError(422, "Could not decode image")
+        content_type = "image/png" if output == "png" else "image/jpeg"
+        return 200, page, content_type, {"X-Document-Detected": "1" if detected else "0"}
+
+    async def handle_new_session(self):
+        session_id = uuid.uuid4().hex
+        self.sessions[session_id] = Session()
+        return self.json_response({"id": session_id}, status=201)
+
+    def get_session(self, session_id):
+        session = self.sessions.get(session_id)
+        if session is None:
+            raise HTTPError(404, "No such session")
+        session.touch()
+        return session
+
+    async def handle_add_page(self, session_id, body):
+        self.get_session(session_id)
+        encoded, detected = await self.run_job(body, "pdf")
+        if encoded is None:
+            raise HTTPError(422, "Could not decode image")
+        # The session may have been deleted while the page was processed
+        session = self.get_session(session_id)
+        async with session.lock:
+            # Writes the page to the spool; keep file I/O off the event loop
+            await asyncio.to_thread(session.pdf_manager.add_encoded_image, *encoded)
+        return self.json_response({"pages": session.pdf_manager.get_image_count(), "detected": detected})
+
+    async def handle_get_pdf(self, session_id):
+        pdf_manager = self.get_session(session_id).pdf_manager
+        if pdf_manager.get_image_count() == 0:
+            raise HTTPError(422, "Session has no pages")
+        pages = pdf_manager.captured_images.snapshot()
+        # Pages are already encoded, so writing is only file I/O
+        data = await asyncio.to_thread(self.write_pdf, pdf_manager, pages)
+        if data is None:
+            raise HTTPError(500, "Could not create PDF")
+        return 200, data, "application/pdf", {}
+
+    def write_pdf(self, pdf_manager, pages):
+        fd, filename = tempfile.mkstemp(suffix=".pdf")
+        os.close(fd)
+        try:
+            if not pdf_manager.write_pdf(filename, pages):
+                return None
+            with open(filename, "rb") as f:
+                return f.read()
+        finally:
+            os.remove(filename)
+
+    async def handle_delete_session(self, session_id):
+        session = self.sessions.pop(session_id, None)
+        if session is None:
+            raise HTTPError(404, "No such session")
+        await asyncio.to_thread(self.close_session, session)
+        return self.json_response({"deleted": session_id})
+
+    def close_session(self, session):
+        session.pdf_manager.clear_all_images()
+        session.pdf_manager.captured_images.close()
+
+    async def expire_sessions(self):
+        """Discard sessions idle for longer than session_ttl. Returns how many"""
+        cutoff = time.monotonic() - self.session_ttl
+        expired = [session_id for session_id, session in self.sessions.items()
+                   if session.last_used < cutoff and not session.lock.locked()]
+        count = 0
+        for session_id in expired:
+            # May have been deleted meanwhile
+            session = self.sessions.pop(session_id, None)
+            if session is not None:
+                await asyncio.to_thread(self.close_session, session)
+                count += 1
+        self.expired_sessions += count
+        return count
+
+    async def sweep_sessions(self):
+        while True:
+            await asyncio.sleep(min(60.0, self.session_ttl))
+            try:
+                await self.expire_sessions()
+            except Exception as e:
+                print(f"Error expiring sessions: {e}")
+
+    def get_metrics(self):
+        endpoints = {}
+        for name, samples in self.latencies.items():
+            window = np.array(samples, dtype=np.float64) * 1000.0
+            p50, p95, p99 = np.percentile(window, [50, 95, 99])
+            endpoints[name] = {"count": len(window), "p50_ms": float(p50), "p95_ms": float(p95), "p99_ms": float(p99)}
+        return {
+            "uptime_s": time.time() - self.started,
+            "workers": self.jobs,
+            "max_queue": self.max_queue,
+            "queue_depth": self.in_flight,
+            "requests": self.requests,
+            "rejected": self.rejected,
+            "errors": self.errors,
+            "sessions": len(self.sessions),
+            "expired_sessions": self.expired_sessions,
+            "latency": endpoints,
+        }
+
+    async def route(self, method, path, query, body):
+        """Return (endpoint name for metrics, response tuple)"""
+        parts = [part for part in path.split("/") if part]
+        if parts == ["scan"] and method == "POST":
+            return "POST /scan", await self.handle_scan(query, body)
+        if parts == ["sessions"] and method == "POST":
+            return "POST /sessions", await self.handle_new_session()
+        if len(parts) == 3 and parts[0] == "sessions" and parts[2] == "pages" and method == "POST":
+            return "POST /sessions/pages", await self.handle_add_page(parts[1], body)
+        if len(parts) == 3 and parts[0] == "sessions" and parts[2] == "pdf" and method == "GET":
+            return "GET /sessions/pdf", await self.handle_get_pdf(parts[1])
+        if len(parts) == 2 and parts[0] == "sessions" and method == "DELETE":
+            return "DELETE /sessions", await self.handle_delete_session(parts[1])
+        if parts == ["metrics"] and method == "GET":
+            return None, self.json_response(self.get_metrics())
+        raise HTTPError(404, "Not found")
+
+    # HTTP plumbing
+
+    def json_response(self, payload, status=200, headers=None):
+        return status, json.dumps(payload).encode(), "application/json", headers or {}
+
+    async def handle_connection(self, reader, writer):
+        try:
+            response, endpoint, start = await self.read_and_dispatch(reader)
+            status, body, content_type, headers = response
+            head = [f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}",
+                    f"Content-Type: {content_type}",
+                    f"Content-Length: {len(body)}",
+                    "Connection: close"]
+            head += [f"{name}: {value}" for name, value in headers.items()]
+            writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+            await writer.drain()
+            if endpoint is not None and status < 400:
+                self.latencies.setdefault(endpoint, deque(maxlen=1000)).append(time.perf_counter() - start)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def read_and_dispatch(self, reader):
+        start = time.perf_counter()
+        endpoint = None
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+            lines = head.decode("latin-1").split("\r\n")
+            try:
+                method, target, _ = lines[0].split(" ", 2)
+            except ValueError:
+                raise HTTPError(400, "Malformed request line")
+            headers = {}
+            for line in lines[1:]:
+                name, _, value = line.partition(":")
+                if name:
+                    headers[name.strip().lower()] = value.strip()
+
+            length = int(headers.get("content-length", 0) or 0)
+            if length > self.max_body:
+                raise HTTPError(413, "Upload too large")
+            body = await reader.readexactly(length) if length else b""
+
+            self.requests += 1
+            url = urlsplit(target)
+            endpoint, response = await self.route(method.upper(), url.path, parse_qs(url.query), body)
+        except HTTPError as e:
+            response = self.json_response({"error": str(e)}, status=e.status, headers=e.headers)
+        except (asyncio.LimitOverrunError, ValueError) as e:
+            response = self.json_response({"error": f"Bad request: {e}"}, status=400)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            raise
+        except Exception as e:
+            print(f"Error handling request: {e}")
+            self.errors += 1
+            response = self.json_response({"error": "Internal error"}, status=500)
+        return response, endpoint, start
+
+    async def serve(self, host="127.0.0.1", port=8765):
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        print(f"Scan service listening on http://{host}:{port} with {self.jobs} workers")
+        sweeper = asyncio.create_task(self.sweep_sessions())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            sweeper.cancel()
+
+    def close(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        for session in self.sessions.values():
+            self.close_session(session)
+        self.sessions.clear()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve document scanning over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1", help="interface to bind (default: localhost only)")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--queue", type=int, default=None, help="requests queued before answering 429 (default: 2 per worker)")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="balanced", help="enhancement preset")
+    parser.add_argument("--bilevel", action="store_true", help="store black and white pages as 1-bit CCITT G4")
+    parser.add_argument("--cache", metavar="DIR", default=None, help="reuse processed pages cached in DIR")
+    parser.add_argument("--session-ttl", type=float, default=1800, help="seconds before an idle session is discarded")
+    args = parser.parse_args(argv)
+
+    service = ScanService(jobs=args.jobs, max_queue=args.queue, preset=args.preset,
+                          cache_dir=args.cache, bilevel=args.bilevel, session_ttl=args.session_ttl)
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,134 @@
+import cv2
+import numpy as np
+
+class SyntheticDocumentGenerator:
+    """
+    Renders fake document photos with known page corners.
+
+    A light page with text-like content is warped with a random perspective
+    onto a darker cluttered background, then lighting gradients, blur and
+    sensor noise are applied. The true corners are returned with every frame
+    so detection accuracy can be measured without a camera.
+    """
+
+    WORDS = ["invoice", "total", "date", "account", "payment", "receipt", "page", "order", "number", "amount"]
+
+    def __init__(self, seed=0):
+        self.rng = np.random.default_rng(seed)
+
+    def make_page(self, width, height, color=False):
+        """Render a flat page of the given size"""
+        paper = int(self.rng.integers(215, 250))
+        page = np.full((height, width, 3), paper, dtype=np.uint8)
+
+        # Lines of text-like content
+        scale = max(0.3, width / 1200.0)
+        thickness = max(1, int(round(scale * 2)))
+        line_height = int(40 * scale)
+        margin = int(60 * scale)
+        y = margin + line_height
+        while y < height - margin:
+            x = margin
+            while x < width - margin:
+                word = str(self.rng.choice(self.WORDS))
+                ink = (20, 20, 20)
+                if color and self.rng.random() < 0.2:
+                    ink = tuple(int(v) for v in self.rng.integers(0, 200, 3))
+                (text_w, _), _ = cv2.getTextSize(word, cv2.FONT_HERSHEY_SIMPLEX, scale, thickness)
+                if x + text_w > width - margin:
+                    break
+                cv2.putText(page, word, (x, y), cv2.FONT_HERSHEY_SIMPLEX, scale, ink, thickness, cv2.LINE_AA)
+                x += text_w + int(15 * scale)
+            y += line_height
+
+        if color:
+            # A coloured block such as a logo or a highlighted table
+            x0 = int(self.rng.integers(margin, max(margin + 1, width // 2)))
+            y0 = int(self.rng.integers(margin, max(margin + 1, height // 2)))
+            fill = tuple(int(v) for v in self.rng.integers(60, 220, 3))
+            cv2.rectangle(page, (x0, y0), (x0 + width // 4, y0 + height // 8), fill, -1)
+        return page
+
+    def make_background(self, width, height, clutter=25):
+        """Darker desk-like background with random shapes"""
+        base = self.rng.integers(30, 90, 3)
+        background = np.empty((height, width, 3), dtype=np.uint8)
+        background[:] = base.astype(np.uint8)
+
+        size = max(width, height)
+        for _ in range(clutter):
+            fill = tuple(int(v) for v in self.rng.integers(10, 140, 3))
+            kind = self.rng.integers(0, 3)
+            x, y = int(self.rng.integers(0, width)), int(self.rng.integers(0, height))
+            extent = int(self.rng.integers(size // 40, size // 8))
+            if kind == 0:
+                cv2.rectangle(background, (x, y), (x + extent, y + extent // 2), fill, -1)
+            elif kind == 1:
+                cv2.circle(background, (x, y), extent // 2, fill, -1)
+            else:
+                end = (x + int(self.rng.integers(-extent, extent)), y + int(self.rng.integers(-extent, extent)))
+                cv2.line(background, (x, y), end, fill, max(1, size // 400))
+        return background
+
+    def random_corners(self, width, height, coverage, perspective):
+        """Page corners as top-left, bottom-left, bottom-right, top-right"""
+        # Page aspect close to A4 in either orientation, scaled to the coverage
+        aspect = 1.414 if self.rng.random() < 0.7 else 1 / 1.414
+        page_h = np.sqrt(coverage * width * height * aspect)
+        page_w = page_h / aspect
+        if page_w > width * 0.9 or page_h > height * 0.9:
+            shrink = min(width * 0.9 / page_w, height * 0.9 / page_h)
+            page_w, page_h = page_w * shrink, page_h * shrink
+
+        cx = width / 2 + self.rng.uniform(-0.1, 0.1) * width
+        cy = height / 2 + self.rng.uniform(-0.1, 0.1) * height
+        corners = np.float32([
+            [cx - page_w / 2, cy - page_h / 2],
+            [cx - page_w / 2, cy + page_h / 2],
+            [cx + page_w / 2, cy + page_h / 2],
+            [cx + page_w / 2, cy - page_h / 2],
+        ])
+
+        # Perspective: move every corner by up to perspective * page size
+        jitter = self.rng.uniform(-perspective, perspective, (4, 2)) * np.float32([page_w, page_h])
+        corners += jitter.astype(np.float32)
+        corners[:, 0] = np.clip(corners[:, 0], 2, width - 3)
+        corners[:, 1] = np.clip(corners[:, 1], 2, height - 3)
+        return corners
+
+    def generate(self, width=640, height=480, coverage=0.45, perspective=0.08, noise=4.0, blur=0.8,
+                 lighting=0.25, clutter=25, color=False):
+        """
+        Render one frame. Returns (frame, corners) where corners is a float32
+        (4, 2) array ordered top-left, bottom-left, bottom-right, top-right.
+        """
+        background = self.make_background(width, height, clutter)
+        corners = self.random_corners(width, height, coverage, perspective)
+
+        # Render the page at roughly its size in the frame
+        page_w = int(max(np.linalg.norm(corners[3] - corners[0]), np.linalg.norm(corners[2] - corners[1])))
+        page_h = int(max(np.linalg.norm(corners[1] - corners[0]), np.linalg.norm(corners[2] - corners[3])))
+        page = self.make_page(max(page_w, 16), max(page_h, 16), color=color)
+
+        src = np.float32([[0, 0], [0, page.shape[0]], [page.shape[1], page.shape[0]], [page.shape[1], 0]])
+        M = cv2.getPerspectiveTransform(src, corners)
+        warped = cv2.warpPerspective(page, M, (width, height))
+        mask = cv2.warpPerspective(np.full(page.shape[:2], 255, np.uint8), M, (width, height))
+        frame = np.where(mask[:, :, None] > 127, warped, background)
+
+        if lighting > 0:
+            # Smooth brightness gradient across the frame, as from a desk lamp
+            gx = np.linspace(-1, 1, width, dtype=np.float32)
+            gy = np.linspace(-1, 1, height, dtype=np.float32)
+            direction = self.rng.uniform(-1, 1, 2)
+            gain = 1.0 + lighting * (gx[None, :] * direction[0] + gy[:, None] * direction[1]) / 2
+            frame = np.clip(frame.astype(np.float32) * gain[:, :, None], 0, 255).astype(np.uint8)
+
+        if blur > 0:
+            frame = cv2.GaussianBlur(frame, (0, 0), blur)
+
+        if noise > 0:
+            grain = self.rng.normal(0, noise, frame.shape).astype(np.float32)
+            frame = np.clip(frame.astype(np.float32) + grain, 0, 255).astype(np.uint8)
+
+        return frame, corners
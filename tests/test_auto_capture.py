@@ -0,0 +1,37 @@
+import cv2
+import numpy as np
+
+from AutoCapture import AutoCapture
+
+CORNERS = np.float32([[100, 80], [100, 400], [540, 400], [540, 80]])
+
+
+def make_frame():
+    # Sharp text-like pattern inside the page
+    frame = np.full((480, 640, 3), 40, dtype=np.uint8)
+    cv2.rectangle(frame, (100, 80), (540, 400), (235, 235, 235), -1)
+    for y in range(100, 390, 12):
+        cv2.line(frame, (120, y), (520, y), (20, 20, 20), 2)
+    return frame
+
+
+def feed(auto_capture, frame, corners, count):
+    return sum(auto_capture.update(frame, corners) for _ in range(count))
+
+
+def test_still_page_with_dropout_is_captured_once():
+    auto_capture = AutoCapture(stable_frames=4)
+    frame = make_frame()
+    assert feed(auto_capture, frame, CORNERS, 10) == 1
+    # A single frame without detection must not re-arm the trigger
+    assert not auto_capture.update(frame, None)
+    assert feed(auto_capture, frame, CORNERS, 20) == 0
+    assert auto_capture.captures == 1
+
+
+def test_page_removed_rearms():
+    auto_capture = AutoCapture(stable_frames=4, rearm_missing_frames=3)
+    frame = make_frame()
+    assert feed(auto_capture, frame, CORNERS, 10) == 1
+    feed(auto_capture, frame, None, 3)
+    assert feed(auto_capture, frame, CORNERS, 10) == 1
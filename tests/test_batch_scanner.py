@@ -0,0 +1,38 @@
+import os
+
+import cv2
+
+from BatchScanner import run_batch, split_name
+from SyntheticDocument import SyntheticDocumentGenerator
+
+
+def test_split_names_are_unique():
+    used = set()
+    names = [split_name(path, used) for path in ("a/scan.jpg", "b/scan.jpg", "c/Scan.png", "d/other.jpg")]
+    assert names == ["scan.pdf", "scan_2.pdf", "Scan_3.pdf", "other.pdf"]
+
+
+def test_split_same_basename_in_two_folders(tmp_path):
+    generator = SyntheticDocumentGenerator(0)
+    paths = []
+    for folder in ("a", "b"):
+        os.makedirs(tmp_path / folder)
+        path = str(tmp_path / folder / "scan.png")
+        cv2.imwrite(path, generator.generate(320, 240)[0])
+        paths.append(path)
+
+    stats = run_batch(paths, str(tmp_path / "out"), split=True, jobs=1)
+    assert len(stats["pdfs"]) == 2
+    assert sorted(os.listdir(tmp_path / "out")) == ["scan.pdf", "scan_2.pdf"]
+
+
+def test_second_run_hits_the_cache(tmp_path):
+    path = str(tmp_path / "page.png")
+    cv2.imwrite(path, SyntheticDocumentGenerator(1).generate(640, 480)[0])
+    cache_dir = str(tmp_path / "cache")
+
+    first = run_batch([path], str(tmp_path / "first.pdf"), jobs=1, cache_dir=cache_dir)
+    second = run_batch([path], str(tmp_path / "second.pdf"), jobs=1, cache_dir=cache_dir)
+    assert first["detected"] == 1
+    assert (first["cache_hits"], first["cache_misses"]) == (0, 1)
+    assert (second["cache_hits"], second["cache_misses"]) == (1, 0)
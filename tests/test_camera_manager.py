@@ -0,0 +1,40 @@
+import cv2
+import numpy as np
+
+from CameraManager import CameraManager
+from FramePool import FramePool
+from FrameSource import create_source
+from SyntheticDocument import SyntheticDocumentGenerator
+
+
+def test_get_frame_without_pool():
+    camera_manager = CameraManager(source=create_source("synthetic:640x480"))
+    frame = camera_manager.get_frame()
+    assert frame is not None
+    assert frame.shape == (480, 640, 3)
+    assert camera_manager.current_image is frame
+
+
+def test_read_pair_with_pool_reuses_buffers():
+    camera_manager = CameraManager(source=create_source("synthetic:640x480"))
+    pool = FramePool(capacity=2)
+    for _ in range(4):
+        frame, still = camera_manager.read_pair(pool)
+        assert frame is not None and still is None
+        pool.release(frame)
+    assert pool.get_stats()["reused"] >= 2
+
+
+def test_scale_corners_to_still_with_other_aspect():
+    # A 4:3 preview showing the middle of a 16:9 still
+    still, truth = SyntheticDocumentGenerator(3).generate(1920, 1080, coverage=0.25, perspective=0.04)
+    preview = cv2.resize(still[:, 240:1680], (640, 480), interpolation=cv2.INTER_AREA)
+    camera_manager = CameraManager(camera_index=None)
+    corners = camera_manager.find_document(preview)
+    assert corners is not None
+
+    mapped = camera_manager.scale_corners_to_still(corners, preview.shape, still)
+    assert mapped is not None
+    points = mapped.reshape(4, 2).astype(np.float32)
+    for corner in truth:
+        assert np.min(np.linalg.norm(points - corner, axis=1)) < 6.0
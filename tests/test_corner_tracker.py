@@ -0,0 +1,32 @@
+import cv2
+import numpy as np
+
+from CameraManager import CameraManager
+from DocumentProcessor import DocumentProcessor
+from SyntheticDocument import SyntheticDocumentGenerator
+
+
+def replay_moving_page(tracking, frames=60):
+    """Mean corner error per frame while the page slides across a 1080p view"""
+    page, corners = SyntheticDocumentGenerator(2).generate(1920, 1080, perspective=0.05, noise=2.0,
+                                                          blur=0.5, clutter=0)
+    camera_manager = CameraManager(camera_index=None, tracking=tracking)
+    errors = []
+    for i in range(frames):
+        offset = np.float32([0.8 * i, 0.8 * i])
+        M = np.float32([[1, 0, offset[0]], [0, 1, offset[1]]])
+        frame = cv2.warpAffine(page, M, (1920, 1080), borderMode=cv2.BORDER_REPLICATE)
+        camera_manager.process_frame(frame, annotate=False)
+        assert camera_manager.document_corners is not None
+        detected = DocumentProcessor.order_corners(camera_manager.document_corners)
+        expected = DocumentProcessor.order_corners(corners + offset)
+        errors.append(float(np.linalg.norm(detected - expected, axis=1).mean()))
+    return errors
+
+
+def test_tracking_error_stays_bounded():
+    errors = replay_moving_page(tracking=True)
+    # Re-detections reseed the track, so error never accumulates; what is
+    # left is the jitter threshold (0.75 detection pixels, about 2 px here)
+    assert max(errors) < 4.0
+    assert np.mean(errors[-20:]) < 3.0
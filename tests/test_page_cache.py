@@ -0,0 +1,43 @@
+import os
+import time
+
+import numpy as np
+
+from PageCache import STALE_TEMP_SECONDS, PageCache
+
+
+def test_trim_removes_stale_temp_files(tmp_path):
+    cache = PageCache(str(tmp_path))
+    stale = tmp_path / "ab" / "crashed.tmp"
+    fresh = tmp_path / "ab" / "writing.tmp"
+    stale.parent.mkdir()
+    stale.write_bytes(b"x")
+    fresh.write_bytes(b"x")
+    old = time.time() - STALE_TEMP_SECONDS - 10
+    os.utime(stale, (old, old))
+
+    cache.trim()
+    assert not stale.exists()
+    assert fresh.exists()
+
+
+def test_put_get_and_stats(tmp_path):
+    cache = PageCache(str(tmp_path))
+    page = np.full((20, 30), 200, dtype=np.uint8)
+    key = cache.make_key(page, None, {})
+    assert cache.get(key) is None
+    assert cache.put(key, page)
+    assert np.array_equal(cache.get(key), page)
+    assert cache.get_stats()["pages"] == 1
+
+
+def test_counts_miss_then_hit(tmp_path):
+    cache = PageCache(str(tmp_path))
+    page = np.full((20, 30), 200, dtype=np.uint8)
+    key = cache.make_key(page, None, {})
+    assert cache.get(key) is None
+    cache.put(key, page)
+    assert cache.get(key) is not None
+    stats = cache.get_stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+    assert stats["hit_rate"] == 0.5
@@ -0,0 +1,36 @@
+import threading
+
+import numpy as np
+
+from PageStore import PageStore
+
+
+def test_append_blocks_when_encoders_fall_behind():
+    store = PageStore(max_workers=1, max_pending=2)
+    release = threading.Event()
+    encode = store.encode
+
+    def slow_encode(image, path):
+        release.wait()
+        return encode(image, path)
+
+    store.encode = slow_encode
+    page = np.full((64, 48, 3), 200, np.uint8)
+    store.append(page)
+    store.append(page)
+
+    third = threading.Thread(target=store.append, args=(page,))
+    third.start()
+    third.join(0.2)
+    # Two raw pages are queued already, so the third has to wait
+    assert third.is_alive()
+    assert len(store) == 2
+
+    release.set()
+    third.join(5)
+    assert not third.is_alive()
+    assert len(store) == 3
+    for page_entry in store.snapshot():
+        data, info = store.read_encoded(page_entry)
+        assert data and info["width"] == 48
+    store.close()
@@ -0,0 +1,13 @@
+from Profiler import Profiler
+
+
+def test_record_is_ignored_while_disabled():
+    profiler = Profiler()
+    profiler.record("camera.open", 0.5)
+    with profiler.stage("detect"):
+        pass
+    assert profiler.get_stats() == {}
+
+    profiler.enabled = True
+    profiler.record("camera.open", 0.5)
+    assert profiler.get_stats()["camera.open"]["count"] == 1
@@ -0,0 +1,22 @@
+import ScanBenchmark
+from DocumentProcessor import DocumentProcessor
+from EnhancementEngine import PRESETS
+
+
+def test_bench_resolution_without_processed_pages(monkeypatch):
+    monkeypatch.setattr(DocumentProcessor, "process_document", lambda self, image, corners, use_cache=True: None)
+    result = ScanBenchmark.bench_resolution(320, 240, frames=2, seed=0, preset="fast", pdf_pages=2)
+    assert result["pdf_seconds"] is None
+    assert result["pdf_pages_per_second"] is None
+
+
+def test_presets_report_fails_over_budget(monkeypatch, tmp_path):
+    report = ScanBenchmark.bench_presets(320, 240, seed=0, repeat=1)
+    results = {result["preset"]: result for result in report["results"]}
+    assert sorted(results) == sorted(PRESETS)
+    assert results["balanced"]["mean_abs_diff"] == 0.0
+
+    # No preset can enhance a page in no time at all
+    monkeypatch.setitem(PRESETS["fast"], "budget_ms_per_mp", 0.0)
+    output = str(tmp_path / "presets.json")
+    assert ScanBenchmark.main(["--presets", "320x240", "-o", output]) == 1
@@ -0,0 +1,78 @@
+import asyncio
+import json
+import os
+import urllib.error
+import urllib.request
+
+import cv2
+import pytest
+
+from ScanService import ScanService
+from SyntheticDocument import SyntheticDocumentGenerator
+
+
+def request(port, method, path, data=None):
+    req = urllib.request.Request(f"http://127.0.0.1:{port}{path}", data=data, method=method)
+    try:
+        with urllib.request.urlopen(req, timeout=60) as response:
+            return response.status, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+
+
+@pytest.fixture
+def upload():
+    frame, _ = SyntheticDocumentGenerator(0).generate(640, 480)
+    return cv2.imencode(".jpg", frame)[1].tobytes()
+
+
+def run_with_service(scenario, **options):
+    service = ScanService(jobs=1, **options)
+
+    async def main():
+        server = await asyncio.start_server(service.handle_connection, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            return await scenario(service, port)
+
+    try:
+        return asyncio.run(main())
+    finally:
+        service.close()
+
+
+def test_scan_and_session_pdf(upload):
+    async def scenario(service, port):
+        status, body = await asyncio.to_thread(request, port, "POST", "/scan?format=png", upload)
+        assert status == 200 and body.startswith(b"\x89PNG")
+
+        status, body = await asyncio.to_thread(request, port, "POST", "/scan", b"not an image")
+        assert status == 422
+
+        status, body = await asyncio.to_thread(request, port, "POST", "/sessions")
+        session_id = json.loads(body)["id"]
+        for pages in (1, 2):
+            status, body = await asyncio.to_thread(request, port, "POST", f"/sessions/{session_id}/pages", upload)
+            assert status == 200 and json.loads(body)["pages"] == pages
+        status, body = await asyncio.to_thread(request, port, "GET", f"/sessions/{session_id}/pdf")
+        assert status == 200 and body.startswith(b"%PDF")
+
+        status, body = await asyncio.to_thread(request, port, "GET", "/metrics")
+        assert json.loads(body)["sessions"] == 1
+
+    run_with_service(scenario)
+
+
+def test_idle_sessions_expire():
+    async def scenario(service, port):
+        status, body = await asyncio.to_thread(request, port, "POST", "/sessions")
+        session_id = json.loads(body)["id"]
+        directory = service.sessions[session_id].pdf_manager.captured_images.directory
+        await asyncio.sleep(0.1)
+        assert await service.expire_sessions() == 1
+        status, _ = await asyncio.to_thread(request, port, "GET", f"/sessions/{session_id}/pdf")
+        assert status == 404
+        return directory
+
+    directory = run_with_service(scenario, session_ttl=0.05)
+    assert not os.path.exists(directory)